@@ -1,10 +1,35 @@
+import threading
+
 import joblib
+import numpy as np
+
+
+# Cyclical time encodings (same as training), looked up instead of recomputed
+_HOUR_ANGLE = 2 * np.pi * np.arange(24) / 24
+_DOW_ANGLE = 2 * np.pi * np.arange(7) / 7
+_HOUR_SIN, _HOUR_COS = np.sin(_HOUR_ANGLE), np.cos(_HOUR_ANGLE)
+_DOW_SIN, _DOW_COS = np.sin(_DOW_ANGLE), np.cos(_DOW_ANGLE)
+
+# Forecasts remembered per input window (oldest dropped first when full)
+MEMO_SIZE = 16384
 
 
 class LoadForecaster:
     def __init__(self, model_path):
         self.model = joblib.load(model_path)
 
+        # Predict through the booster directly: the sklearn wrapper re-validates
+        # the input on every call, which dominates a 6-row prediction.
+        self._booster = self.model.booster_
+        self._n_features = self.model.n_features_in_
+
+        # A forecast depends only on the last `hours_ahead` samples, so
+        # repeated runs over the same profile can reuse earlier predictions.
+        # One forecaster may serve several threads (Streamlit sessions), so
+        # the memo is only read or changed under its lock.
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
     def predict_next(self, history_df, hours_ahead=6):
         """
         Predict load for the next N hours.
@@ -13,20 +38,66 @@ class LoadForecaster:
         - timestamp (int timestep)
         - load_kw
         """
+        return self.predict_arrays(
+            history_df["timestamp"].to_numpy(),
+            history_df["load_kw"].to_numpy(),
+            hours_ahead=hours_ahead,
+        )
 
-        df = history_df.copy()
+    def predict_arrays(self, timestamps, load_kw, hours_ahead=6):
+        """
+        Same as predict_next, from plain arrays of timesteps and loads
+        (oldest first), so callers need not build a DataFrame.
+        """
+
+        # Only the last `hours_ahead` samples feed the model
+        ts = np.asarray(timestamps, dtype=np.int64)[-hours_ahead:]
+        load = np.asarray(load_kw, dtype=np.float64)[-hours_ahead:]
 
-        # Time features (same as training)
-        df["hour"] = df["timestamp"] % 24
-        df["dayofweek"] = (df["timestamp"] // 24) % 7
+        key = ts.tobytes() + load.tobytes()
+        with self._memo_lock:
+            cached = self._memo.get(key)
+        if cached is not None:
+            return cached
 
-        # REQUIRED third feature (last known load)
-        df["prev_load_kw"] = df["load_kw"]
+        pred = self._booster.predict(self._features(ts, load), num_threads=1)
+        pred.flags.writeable = False  # shared by every hit on this window
 
-        X = df[["hour", "dayofweek", "prev_load_kw"]].tail(hours_ahead)
+        with self._memo_lock:
+            if len(self._memo) >= MEMO_SIZE:
+                del self._memo[next(iter(self._memo))]
+            self._memo[key] = pred
+        return pred
 
-        predictions = self.model.predict(X)
-        return predictions.tolist()
+    def predict_batch(self, timestamps, load_kw):
+        """
+        One prediction per sample, for a whole run in a single model call.
+
+        Each row's prediction depends only on that row, so the forecast
+        predict_arrays returns for a window equals the slice of this result
+        over the window's last `hours_ahead` samples.
+        """
+        pred = self._booster.predict(
+            self._features(
+                np.asarray(timestamps, dtype=np.int64),
+                np.asarray(load_kw, dtype=np.float64),
+            )
+        )
+        pred.flags.writeable = False  # callers hand out slices of it
+        return pred
 
+    def _features(self, ts, load):
+        # Allocated per call so one forecaster can be shared across threads
+        X = np.empty((len(ts), self._n_features), dtype=np.float32)
 
+        # REQUIRED first feature (last known load)
+        X[:, 0] = load
 
+        # Cyclical time features (same as training)
+        hour = ts % 24
+        dow = (ts // 24) % 7
+        X[:, 1] = _HOUR_SIN[hour]
+        X[:, 2] = _HOUR_COS[hour]
+        X[:, 3] = _DOW_SIN[dow]
+        X[:, 4] = _DOW_COS[dow]
+        return X
@@ -1,30 +1,38 @@
+import numpy as np
 import pandas as pd
 
 INPUT_FILE = "data/raw/openei/hospital_load.csv"
 OUTPUT_FILE = "data/load_history.csv"
+PARQUET_FILE = "data/load_history.parquet"
 
-# Read hospital load file
-df = pd.read_csv(INPUT_FILE)
-
-# Parse timestamp
-df["timestamp"] = pd.to_datetime(
-    "2004 " + df["Date/Time"].str.strip(),
-    format="%Y %m/%d %H:%M:%S",
-    errors="coerce"
+# Read hospital load file (only the columns we use)
+df = pd.read_csv(
+    INPUT_FILE,
+    usecols=["Date/Time", "Electricity:Facility [kW](Hourly)"],
+    dtype={"Electricity:Facility [kW](Hourly)": "float64"},
 )
 
-# Use TOTAL facility electricity (kW)
-df["load_kw"] = df["Electricity:Facility [kW](Hourly)"]
-
+# Parse timestamp (unparseable rows, e.g. "24:00:00", become NaT)
+timestamp = pd.to_datetime(
+    "2004/" + df["Date/Time"].str.strip(),
+    format="%Y/%m/%d %H:%M:%S",
+    errors="coerce",
+    cache=True,
+)
 
-# Keep only required columns
-df = df[["timestamp", "load_kw"]]
+# Use TOTAL facility electricity (kW), clipped in place
+load_kw = df["Electricity:Facility [kW](Hourly)"].to_numpy(dtype=np.float64, copy=True)
+np.clip(load_kw, 0, None, out=load_kw)
 
-# Clean
-df["load_kw"] = df["load_kw"].clip(lower=0)
-df = df.dropna()
+# Clean: one mask drops rows with a missing timestamp or load
+valid = timestamp.notna().to_numpy() & ~np.isnan(load_kw)
 
-# Save
-df.to_csv(OUTPUT_FILE, index=False)
+# Save (CSV for the scenarios, Parquet for training)
+out = pd.DataFrame({
+    "timestamp": timestamp[valid],
+    "load_kw": load_kw[valid],
+})
+out.to_csv(OUTPUT_FILE, index=False)
+out.to_parquet(PARQUET_FILE, engine="pyarrow", compression="snappy", index=False)
 
-print("load_history.csv created successfully")
+print("load_history.csv / load_history.parquet created successfully")
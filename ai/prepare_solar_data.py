@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 PV_CAPACITY_KW = 150
@@ -7,27 +8,34 @@ SYSTEM_LOSS = 0.15
 INPUT_FILE = "data/raw/solar_nsrdb.csv"
 OUTPUT_FILE = "data/solar_history.csv"
 
-# Read NSRDB file (skip metadata rows)
+# Read NSRDB file (skip metadata rows; Year is overridden below)
 df = pd.read_csv(
     INPUT_FILE,
-    skiprows=2
+    skiprows=2,
+    usecols=["Month", "Day", "Hour", "Minute", "GHI"],
+    dtype={
+        "Month": "int8",
+        "Day": "int8",
+        "Hour": "int8",
+        "Minute": "int8",
+        "GHI": "float64",
+    },
 )
 
-# Build timestamp from actual columns
+# Build timestamp from actual columns, pinned to the load profile's year
+df["Year"] = 2004
 df["timestamp"] = pd.to_datetime(
     df[["Year", "Month", "Day", "Hour", "Minute"]]
 )
 
-df["timestamp"] = df["timestamp"].apply(lambda t: t.replace(year=2004))
 
-
-# Convert GHI (W/m^2) to solar power (kW)
-df["solar_kw"] = (
-    df["GHI"] * PANEL_EFFICIENCY * (1 - SYSTEM_LOSS) * PV_CAPACITY_KW / 1000
-)
+# Convert GHI (W/m^2) to solar power (kW), factor by factor (folding the
+# constants first rounds differently and changes the written values)
+ghi = df["GHI"].to_numpy(dtype=np.float64)
+solar_kw = ghi * PANEL_EFFICIENCY * (1 - SYSTEM_LOSS) * PV_CAPACITY_KW / 1000
 
 # Clean values
-df["solar_kw"] = df["solar_kw"].clip(lower=0)
+df["solar_kw"] = solar_kw.clip(min=0)
 
 # Keep only required columns
 df[["timestamp", "solar_kw"]].to_csv(OUTPUT_FILE, index=False)
@@ -1,13 +1,19 @@
 import joblib
+import numpy as np
 import pandas as pd
 
 model = joblib.load("ai/models/load_forecaster.pkl")
 
-# Example future conditions
+# Example current conditions (load 6 hours from each is predicted)
+hour = np.array([2, 12, 18])
+dayofweek = np.array([1, 1, 1])
+
 test_data = pd.DataFrame({
-    "solar_kw": [0, 20, 80],
-    "hour": [2, 12, 18],
-    "dayofweek": [1, 1, 1]
+    "load_kw": [700, 1100, 1300],
+    "hour_sin": np.sin(2 * np.pi * hour / 24),
+    "hour_cos": np.cos(2 * np.pi * hour / 24),
+    "dow_sin": np.sin(2 * np.pi * dayofweek / 7),
+    "dow_cos": np.cos(2 * np.pi * dayofweek / 7),
 })
 
 pred = model.predict(test_data)
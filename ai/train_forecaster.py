@@ -1,51 +1,67 @@
+import numpy as np
 import pandas as pd
 import lightgbm as lgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 import joblib
 
-load_df = pd.read_csv("data/load_history.csv", parse_dates=["timestamp"])
-solar_df = pd.read_csv("data/solar_history.csv", parse_dates=["timestamp"])
+# Hours between a sample and the load it predicts: a window's last
+# HORIZON_H rows then forecast the next HORIZON_H hours, oldest first
+HORIZON_H = 6
 
-# Force hourly alignment (CRITICAL FIX)
-load_df["timestamp"] = load_df["timestamp"].dt.floor("H")
-solar_df["timestamp"] = solar_df["timestamp"].dt.floor("H")
+load_df = pd.read_parquet("data/load_history.parquet")
 
-# Merge after alignment
-df = pd.merge(load_df, solar_df, on="timestamp", how="inner")
+# The simulator replays this profile row by row, so row i is timestep i
+load_df = load_df.sort_values("timestamp", ignore_index=True)
 
-print("Merged samples:", len(df))
+print("Samples:", len(load_df))
 
 
-# Feature engineering (safe + minimal)
-df["hour"] = df["timestamp"].dt.hour
-df["dayofweek"] = df["timestamp"].dt.dayofweek
+# Feature engineering (safe + minimal), exactly what LoadForecaster builds
+# at run time: the load at a timestep plus cyclical encodings of that
+# timestep's hour and day (23h sits next to 0h, day 6 next to day 0)
+FEATURES = ["load_kw", "hour_sin", "hour_cos", "dow_sin", "dow_cos"]
 
-X = df[["solar_kw", "hour", "dayofweek"]]
-y = df["load_kw"]
+two_pi = 2 * np.pi
+step = np.arange(len(load_df))
+hour = (step % 24).astype(np.float32)
+dow = ((step // 24) % 7).astype(np.float32)
+load = load_df["load_kw"].to_numpy(dtype=np.float32)
+
+# Contiguous float32 matrices skip LightGBM's DataFrame adapter copies
+X = np.column_stack([
+    load,
+    np.sin(two_pi * hour / 24),
+    np.cos(two_pi * hour / 24),
+    np.sin(two_pi * dow / 7),
+    np.cos(two_pi * dow / 7),
+]).astype(np.float32, copy=False)[:-HORIZON_H]
+y = load[HORIZON_H:]
 
 # Train / test split (time-safe)
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, shuffle=False, test_size=0.2
 )
 
-# Train LightGBM
+# Train LightGBM (all cores; column-wise histograms)
 model = lgb.LGBMRegressor(
     n_estimators=300,
     learning_rate=0.05,
     max_depth=6,
+    num_leaves=31,
+    min_child_samples=100,
+    n_jobs=-1,
+    force_col_wise=True,
     random_state=42
 )
 
-model.fit(X_train, y_train)
+model.fit(X_train, y_train, feature_name=FEATURES)
 
-# Evaluate
-pred = model.predict(X_test)
+# Evaluate (through the booster, as LoadForecaster predicts at run time)
+pred = model.booster_.predict(X_test)
 mae = mean_absolute_error(y_test, pred)
 print("MAE (kW):", round(mae, 2))
 
 # Save model
 joblib.dump(model, "ai/models/load_forecaster.pkl")
 print("Model saved to ai/models/load_forecaster.pkl")
-
-
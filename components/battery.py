@@ -1,4 +1,9 @@
+import numpy as np
+
+
 class Battery:
+    __slots__ = ("capacity", "soc", "max_charge_kw", "max_discharge_kw")
+
     def __init__(self, capacity_kwh, soc_init=0.5, max_charge_kw=50, max_discharge_kw=50):
         self.capacity = capacity_kwh
         self.soc = soc_init  # 0–1
@@ -21,3 +26,65 @@ class Battery:
         actual = min(energy, available)
         self.soc = max(min_soc, self.soc - actual / self.capacity)
         return actual
+
+    def simulate(self, power_kw, dt=1.0, min_soc=0.0):
+        """
+        Apply a whole power-command trace at once (batch / Monte-Carlo use).
+
+        power_kw > 0 charges and < 0 discharges, with the same rating limits
+        and SOC bounds as charge()/discharge(); assumes soc starts >= min_soc.
+        Returns (soc, energy): SOC after each step and the energy (kWh) each
+        step actually moved, signed like power_kw. Updates self.soc.
+        """
+        power_kw = np.asarray(power_kw, dtype=np.float64)
+        min_soc = max(0.0, min(1.0, float(min_soc)))
+
+        requested = np.where(
+            power_kw >= 0,
+            np.minimum(power_kw, self.max_charge_kw),
+            np.maximum(power_kw, -self.max_discharge_kw),
+        ) * dt
+        delta = requested / self.capacity
+
+        # Unclamped SOC is a running sum; it is only restarted where it would
+        # leave [min_soc, 1]. While pinned at a bound, steps pushing further
+        # out change nothing, so jump straight to the next step pulling back.
+        csum = np.cumsum(delta)
+        pulls_down = np.flatnonzero(delta < 0)
+        pulls_up = np.flatnonzero(delta > 0)
+
+        n = len(delta)
+        soc = np.empty(n)
+        level = float(self.soc)
+        start = 0
+        while start < n:
+            base = level - (csum[start - 1] if start else 0.0)
+
+            width = 64
+            while True:
+                stop = min(n, start + width)
+                path = base + csum[start:stop]
+                out = (path > 1.0) | (path < min_soc)
+                if stop == n or out.any():
+                    break
+                width *= 2
+
+            if not out.any():
+                soc[start:] = path
+                break
+
+            k = int(np.argmax(out))
+            soc[start:start + k] = path[:k]
+            if path[k] > 1.0:
+                level, resume = 1.0, pulls_down
+            else:
+                level, resume = min_soc, pulls_up
+            i = np.searchsorted(resume, start + k + 1)
+            nxt = int(resume[i]) if i < len(resume) else n
+            soc[start + k:nxt] = level
+            start = nxt
+
+        energy = np.diff(soc, prepend=self.soc) * self.capacity
+        if n:
+            self.soc = float(soc[-1])
+        return soc, energy
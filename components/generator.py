@@ -1,4 +1,6 @@
 class DieselGenerator:
+    __slots__ = ("max_power_kw", "is_on")
+
     def __init__(self, max_power_kw):
         self.max_power_kw = max_power_kw
         self.is_on = False
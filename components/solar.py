@@ -1,6 +1,12 @@
+import numpy as np
+
+
 class SolarPV:
+    __slots__ = ("max_power_kw",)
+
     def __init__(self, max_power_kw):
         self.max_power_kw = max_power_kw
 
     def get_power(self, available_power_kw):
-        return min(self.max_power_kw, available_power_kw)
+        # Works on a single reading or a whole profile array
+        return np.minimum(self.max_power_kw, available_power_kw)
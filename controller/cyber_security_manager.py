@@ -1,4 +1,35 @@
 import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+# Human-readable reasons, indexed by the code returned from _detect_anomaly
+_ANOMALY_REASONS = (
+    None,
+    "SOC sensor spoofing detected (out-of-range)",
+    "SOC sensor spoofing detected (mismatch vs secure channel)",
+    "SOC anomaly detected (implausible step change)",
+    "Load sensor spoofing detected (negative)",
+    "Load sensor spoofing detected (mismatch vs secure channel)",
+    "Load anomaly detected (implausible step change)",
+    "Solar sensor spoofing detected (negative)",
+    "Solar sensor spoofing detected (mismatch vs secure channel)",
+    "Solar anomaly detected (implausible step change)",
+)
+
+
+class SensorReading(NamedTuple):
+    """
+    One timestep of sensed values plus their secure redundant channels.
+    None means "no reading" and skips the checks that need it.
+    """
+    soc: Optional[float] = None
+    soc_secure: Optional[float] = None
+    load_kw: Optional[float] = None
+    load_kw_secure: Optional[float] = None
+    solar_kw: Optional[float] = None
+    solar_kw_secure: Optional[float] = None
 
 
 class CyberSecurityManager:
@@ -6,13 +37,32 @@ class CyberSecurityManager:
     Detects cyber attacks such as sensor spoofing or command injection.
     """
 
-    def __init__(self):
+    __slots__ = (
+        "log_dir",
+        "alert_active",
+        "anomaly_now",
+        "reason",
+        "_last_soc",
+        "_last_load",
+        "_last_solar",
+        "_log_fh",
+        "max_soc_jump_per_step",
+        "redundant_soc_mismatch",
+        "redundant_load_mismatch_frac",
+        "redundant_solar_mismatch_frac",
+        "max_load_jump_kw",
+        "max_solar_jump_kw",
+    )
+
+    def __init__(self, log_dir="logs"):
+        self.log_dir = log_dir
         self.alert_active = False
         self.anomaly_now = False
         self.reason = None
         self._last_soc = None
         self._last_load = None
         self._last_solar = None
+        self._log_fh = None  # opened on first event, kept open (buffered)
 
         # Detection thresholds (tunable)
         self.max_soc_jump_per_step = 0.08  # 8% SOC jump in 1 timestep is suspicious
@@ -26,122 +76,233 @@ class CyberSecurityManager:
         self.max_load_jump_kw = 500.0
         self.max_solar_jump_kw = 800.0
 
-    def evaluate(self, sensor_data):
+    def evaluate(self, reading):
+        """
+        Simple rule-based cyber detection on a SensorReading.
+        """
+        soc, soc_secure, load_kw, load_kw_secure, solar_kw, solar_kw_secure = reading
+
+        # Coerce each reading once; the checks below work on plain floats
+        if soc is not None:
+            soc = float(soc)
+        if soc_secure is not None:
+            soc_secure = float(soc_secure)
+        if load_kw is not None:
+            load_kw = float(load_kw)
+        if load_kw_secure is not None:
+            load_kw_secure = float(load_kw_secure)
+        if solar_kw is not None:
+            solar_kw = float(solar_kw)
+        if solar_kw_secure is not None:
+            solar_kw_secure = float(solar_kw_secure)
+
+        code = self._detect_anomaly(
+            soc,
+            soc_secure,
+            load_kw,
+            load_kw_secure,
+            solar_kw,
+            solar_kw_secure,
+        )
+        anomaly = code != 0
+
+        if soc is not None:
+            self._last_soc = soc
+        if load_kw is not None:
+            self._last_load = load_kw
+        if solar_kw is not None:
+            self._last_solar = solar_kw
+
+        # Expose the instantaneous anomaly (useful for dashboards and debugging)
+        self.anomaly_now = anomaly
+
+        # Latch alert once detected (requires reset / operator action in real systems)
+        if anomaly:
+            self.alert_active = True
+            self.reason = _ANOMALY_REASONS[code]
+
+        return self.alert_active
+
+    def evaluate_batch(
+        self,
+        soc,
+        soc_secure,
+        load_kw,
+        load_kw_secure,
+        solar_kw,
+        solar_kw_secure,
+    ):
         """
-        Simple rule-based cyber detection.
+        Vectorized evaluate() over whole sensor traces (e.g. forensic replay).
+
+        Takes equal-length arrays, applies the same rules in the same priority
+        order and leaves the manager in the state N evaluate() calls would.
+        Returns (alert, anomaly, reasons): the latched alert per step, the
+        instantaneous anomaly per step, and the reason string (or None).
+        """
+        soc = np.asarray(soc, dtype=np.float64)
+        soc_secure = np.asarray(soc_secure, dtype=np.float64)
+        load_kw = np.asarray(load_kw, dtype=np.float64)
+        load_kw_secure = np.asarray(load_kw_secure, dtype=np.float64)
+        solar_kw = np.asarray(solar_kw, dtype=np.float64)
+        solar_kw_secure = np.asarray(solar_kw_secure, dtype=np.float64)
+
+        n = len(soc)
+        if n == 0:
+            empty = np.zeros(0, dtype=bool)
+            return empty, empty, np.empty(0, dtype=object)
+
+        # Previous reading per step (NaN where there is none: never a jump)
+        def _prev(x, last):
+            return np.concatenate(([np.nan if last is None else last], x[:-1]))
+
+        def _mismatch(x, secure):
+            return np.abs(x - secure) / np.maximum(1.0, np.abs(secure))
+
+        # (reason code, mask) in the same priority order as _detect_anomaly()
+        with np.errstate(invalid="ignore"):
+            rules = [
+                (1, (soc < 0) | (soc > 1)),
+                (4, load_kw < 0),
+                (7, solar_kw < 0),
+                (2, np.abs(soc - soc_secure) > self.redundant_soc_mismatch),
+                (3, np.abs(soc - _prev(soc, self._last_soc)) > self.max_soc_jump_per_step),
+                (5, _mismatch(load_kw, load_kw_secure) > self.redundant_load_mismatch_frac),
+                (6, np.abs(load_kw - _prev(load_kw, self._last_load)) > self.max_load_jump_kw),
+                (8, _mismatch(solar_kw, solar_kw_secure) > self.redundant_solar_mismatch_frac),
+                (9, np.abs(solar_kw - _prev(solar_kw, self._last_solar)) > self.max_solar_jump_kw),
+            ]
+        checks = [mask for _, mask in rules]
+
+        # First rule that fires wins, exactly as in _detect_anomaly()
+        codes = np.select(checks, [code for code, _ in rules], 0)
+        anomaly = np.logical_or.reduce(checks)
+        reasons = np.array(_ANOMALY_REASONS, dtype=object)[codes]
+
+        alert = np.full(n, self.alert_active, dtype=bool)
+        if anomaly.any():
+            first_anomaly = int(np.argmax(anomaly))
+            alert[first_anomaly:] = True
+            last_anomaly = n - 1 - int(np.argmax(anomaly[::-1]))
+            self.alert_active = True
+            self.reason = reasons[last_anomaly]
+
+        self._last_soc = float(soc[-1])
+        self._last_load = float(load_kw[-1])
+        self._last_solar = float(solar_kw[-1])
+        self.anomaly_now = bool(anomaly[-1])
+
+        return alert, anomaly, reasons
+
+    def _detect_anomaly(
+        self,
+        soc,
+        soc_secure,
+        load_kw,
+        load_kw_secure,
+        solar_kw,
+        solar_kw_secure,
+    ):
         """
-        soc = sensor_data.get("soc")
-        soc_secure = sensor_data.get("soc_secure")
-        load_kw = sensor_data.get("load_kw")
-        load_kw_secure = sensor_data.get("load_kw_secure")
-        solar_kw = sensor_data.get("solar_kw")
-        solar_kw_secure = sensor_data.get("solar_kw_secure")
+        Numeric anomaly checks only (no state changes, no I/O).
 
-        anomaly = False
-        reason = None
+        Takes floats (or None for "no reading") and returns 0 when all readings
+        are plausible, otherwise the index into _ANOMALY_REASONS of the first
+        rule that fired. Range checks run before mismatch and jump checks.
+        """
+        last_soc = self._last_soc
+        last_load = self._last_load
+        last_solar = self._last_solar
 
+        # --------------------------------------------------
+        # RANGE CHECKS (single comparisons, checked first)
+        # --------------------------------------------------
         # Impossible SOC values → spoofing
         if soc is not None and (soc < 0 or soc > 1):
-            anomaly = True
-            reason = "SOC sensor spoofing detected (out-of-range)"
+            return 1
+
+        # Negative load / PV readings → spoofing
+        if load_kw is not None and load_kw < 0:
+            return 4
 
+        if solar_kw is not None and solar_kw < 0:
+            return 7
+
+        # --------------------------------------------------
+        # SOC SENSOR SPOOFING
+        # --------------------------------------------------
         # Redundant secure channel mismatch → spoofing (realistic bounded spoof)
         if (
-            not anomaly
-            and soc is not None
+            soc is not None
             and soc_secure is not None
-            and abs(float(soc) - float(soc_secure)) > self.redundant_soc_mismatch
+            and abs(soc - soc_secure) > self.redundant_soc_mismatch
         ):
-            anomaly = True
-            reason = "SOC sensor spoofing detected (mismatch vs secure channel)"
+            return 2
 
         # Implausible SOC jump → spoofing/anomaly
         if (
-            not anomaly
-            and soc is not None
-            and self._last_soc is not None
-            and abs(float(soc) - float(self._last_soc)) > self.max_soc_jump_per_step
+            soc is not None
+            and last_soc is not None
+            and abs(soc - last_soc) > self.max_soc_jump_per_step
         ):
-            anomaly = True
-            reason = "SOC anomaly detected (implausible step change)"
-
-        if soc is not None:
-            self._last_soc = float(soc)
+            return 3
 
         # --------------------------------------------------
         # LOAD SENSOR SPOOFING
         # --------------------------------------------------
-        if not anomaly and load_kw is not None and float(load_kw) < 0:
-            anomaly = True
-            reason = "Load sensor spoofing detected (negative)"
+        if load_kw is not None and load_kw_secure is not None:
+            denom = max(1.0, abs(load_kw_secure))
+            if abs(load_kw - load_kw_secure) / denom > self.redundant_load_mismatch_frac:
+                return 5
 
         if (
-            not anomaly
-            and load_kw is not None
-            and load_kw_secure is not None
+            load_kw is not None
+            and last_load is not None
+            and abs(load_kw - last_load) > self.max_load_jump_kw
         ):
-            secure = float(load_kw_secure)
-            denom = max(1.0, abs(secure))
-            if abs(float(load_kw) - secure) / denom > self.redundant_load_mismatch_frac:
-                anomaly = True
-                reason = "Load sensor spoofing detected (mismatch vs secure channel)"
-
-        if (
-            not anomaly
-            and load_kw is not None
-            and self._last_load is not None
-            and abs(float(load_kw) - float(self._last_load)) > self.max_load_jump_kw
-        ):
-            anomaly = True
-            reason = "Load anomaly detected (implausible step change)"
-
-        if load_kw is not None:
-            self._last_load = float(load_kw)
+            return 6
 
         # --------------------------------------------------
         # SOLAR SENSOR SPOOFING
         # --------------------------------------------------
-        if not anomaly and solar_kw is not None and float(solar_kw) < 0:
-            anomaly = True
-            reason = "Solar sensor spoofing detected (negative)"
+        if solar_kw is not None and solar_kw_secure is not None:
+            denom = max(1.0, abs(solar_kw_secure))
+            if abs(solar_kw - solar_kw_secure) / denom > self.redundant_solar_mismatch_frac:
+                return 8
 
         if (
-            not anomaly
-            and solar_kw is not None
-            and solar_kw_secure is not None
+            solar_kw is not None
+            and last_solar is not None
+            and abs(solar_kw - last_solar) > self.max_solar_jump_kw
         ):
-            secure = float(solar_kw_secure)
-            denom = max(1.0, abs(secure))
-            if abs(float(solar_kw) - secure) / denom > self.redundant_solar_mismatch_frac:
-                anomaly = True
-                reason = "Solar sensor spoofing detected (mismatch vs secure channel)"
-
-        if (
-            not anomaly
-            and solar_kw is not None
-            and self._last_solar is not None
-            and abs(float(solar_kw) - float(self._last_solar)) > self.max_solar_jump_kw
-        ):
-            anomaly = True
-            reason = "Solar anomaly detected (implausible step change)"
-
-        if solar_kw is not None:
-            self._last_solar = float(solar_kw)
-
-        # Expose the instantaneous anomaly (useful for dashboards and debugging)
-        self.anomaly_now = anomaly
+            return 9
 
-        # Latch alert once detected (requires reset / operator action in real systems)
-        if anomaly:
-            self.alert_active = True
-            self.reason = reason
-
-        return self.alert_active
+        return 0
 
     def raise_alert(self, time_step):
         self.log_event(time_step, f"CYBER ALERT: {self.reason}")
+        # Alerts go to disk at once, not whenever the buffer next fills
+        self._log_fh.flush()
 
     def log_event(self, time_step, message: str):
-        os.makedirs("logs", exist_ok=True)
-        with open("logs/cyber_events.txt", "a", encoding="utf-8") as f:
-            f.write(f"time={time_step} {message}\n")
+        if self._log_fh is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._log_fh = open(
+                os.path.join(self.log_dir, "cyber_events.txt"),
+                "a",
+                encoding="utf-8",
+                buffering=1 << 16,
+            )
+        self._log_fh.write(f"time={time_step} {message}\n")
+
+    def close(self):
+        """
+        Flush and close the event log (reopened on the next event).
+        """
+        if self._log_fh is not None:
+            self._log_fh.close()
+            self._log_fh = None
+
+    def __del__(self):
+        # Last resort only: whoever logs events calls close() when done
+        self.close()
@@ -1,5 +1,7 @@
 from enum import Enum
 
+import numpy as np
+
 
 class SystemState(Enum):
     NORMAL = "NORMAL"
@@ -31,8 +33,95 @@ class MicrogridController:
     LOAD_SHED_T2 = 2
     LOAD_SHED_T1 = 3
 
+    # ==========================================================
+    # ACTION TEMPLATES (BUILT ONCE; decide() RETURNS COPIES)
+    # ==========================================================
+
+    _ACTION_PREDICTIVE = {
+        "generator_cmd": "START",
+        "battery_mode": "DISCHARGE",
+        "load_shed_level": LOAD_SHED_NONE,
+        "safe_mode": False,
+        "reason": (
+            "Predictive generator start based on AI load forecast; "
+            "preventing future SOC collapse"
+        ),
+    }
+
+    _ACTION_PREEMPT = {
+        "generator_cmd": "START",
+        "battery_mode": "PROTECT",
+        "load_shed_level": LOAD_SHED_T2,
+        "state": SystemState.EMERGENCY.value,
+        "safe_mode": False,
+        "reason": (
+            "Hard SOC preemption: generator forced ON before "
+            "absolute SOC violation (hospital safety guarantee)"
+        ),
+    }
+
+    _ACTION_DEFICIT = {
+        "generator_cmd": "START",
+        "battery_mode": "DISCHARGE",
+        "load_shed_level": LOAD_SHED_NONE,
+        "safe_mode": False,
+        "reason": (
+            "Early generator start due to sustained power deficit; "
+            "preventing rapid SOC collapse and voltage risk"
+        ),
+    }
+
+    _ACTION_NORMAL = {
+        "generator_cmd": "STOP",
+        "battery_mode": "DISCHARGE",
+        "load_shed_level": LOAD_SHED_NONE,
+        "state": SystemState.NORMAL.value,
+        "safe_mode": False,
+        "reason": "Battery SOC healthy; normal hospital operation",
+    }
+
+    _ACTION_STRESSED = {
+        "generator_cmd": "START",
+        "battery_mode": "DISCHARGE",
+        "load_shed_level": LOAD_SHED_T3,
+        "state": SystemState.STRESSED.value,
+        "safe_mode": False,
+        "reason": (
+            "Preventive generator start due to declining SOC; "
+            "maintaining energy buffer for critical loads"
+        ),
+    }
+
+    _ACTION_EMERGENCY_AVAIL = {
+        "generator_cmd": "START",
+        "battery_mode": "PROTECT",
+        "load_shed_level": LOAD_SHED_T2,
+        "state": SystemState.EMERGENCY.value,
+        "safe_mode": False,
+        "reason": (
+            "Emergency condition: preserving life-critical hospital loads "
+            "and preventing inverter starvation"
+        ),
+    }
+
+    _ACTION_EMERGENCY_HOLD = dict(_ACTION_EMERGENCY_AVAIL, generator_cmd="HOLD")
+
+    _ACTION_SAFE_MODE = {
+        "generator_cmd": "START",
+        "battery_mode": "PROTECT",
+        "load_shed_level": LOAD_SHED_T1,
+        "state": SystemState.SAFE_MODE.value,
+        "safe_mode": True,
+    }
+
     def __init__(self):
-        self.state = SystemState.NORMAL
+        self._set_state(SystemState.NORMAL)
+
+    def _set_state(self, state):
+        # Keep the string form alongside the enum so decide() never has to
+        # go through Enum.value on the hot path.
+        self.state = state
+        self._state_str = state.value
 
     # ==========================================================
     # MAIN CONTROL LOOP
@@ -51,51 +140,39 @@ class MicrogridController:
         # 1. HARD FAIL-SAFE: CYBER OR SENSOR ANOMALY
         # ------------------------------------------------------
         if cyber_anomaly:
-            self.state = SystemState.SAFE_MODE
+            self._set_state(SystemState.SAFE_MODE)
             return self._safe_mode_action(
                 reason="Cyber or sensor anomaly detected — entering SAFE_MODE"
             )
 
         soc = battery.soc
 
+        # Thresholds used on more than one path, bound once per call
+        soc_stressed_min = self.SOC_STRESSED_MIN
+        deficit_threshold = load_kw * self.POWER_DEFICIT_MARGIN
+
         # ------------------------------------------------------
         # 2. AI-BASED PREDICTIVE PREEMPTION (NEW, SAFE)
         # ------------------------------------------------------
-        if load_forecast and generator_available:
-            avg_future_load = sum(load_forecast) / len(load_forecast)
+        if (
+            load_forecast is not None
+            and len(load_forecast) > 0
+            and generator_available
+        ):
+            avg_future_load = float(np.mean(load_forecast))
 
             if (
                 avg_future_load > load_kw * 1.10
-                and soc < self.SOC_STRESSED_MIN
+                and soc < soc_stressed_min
             ):
-                return {
-                    "generator_cmd": "START",
-                    "battery_mode": "DISCHARGE",
-                    "load_shed_level": self.LOAD_SHED_NONE,
-                    "state": self.state.value,
-                    "safe_mode": False,
-                    "reason": (
-                        "Predictive generator start based on AI load forecast; "
-                        "preventing future SOC collapse"
-                    )
-                }
+                return dict(self._ACTION_PREDICTIVE, state=self._state_str)
 
         # ------------------------------------------------------
         # 3. HARD SAFETY PREEMPTION (DO NOT REMOVE)
         # ------------------------------------------------------
         if generator_available and soc <= self.SOC_CRITICAL_PREEMPT:
-            self.state = SystemState.EMERGENCY
-            return {
-                "generator_cmd": "START",
-                "battery_mode": "PROTECT",
-                "load_shed_level": self.LOAD_SHED_T2,
-                "state": self.state.value,
-                "safe_mode": False,
-                "reason": (
-                    "Hard SOC preemption: generator forced ON before "
-                    "absolute SOC violation (hospital safety guarantee)"
-                )
-            }
+            self._set_state(SystemState.EMERGENCY)
+            return self._ACTION_PREEMPT.copy()
 
         # ------------------------------------------------------
         # 4. EARLY GENERATOR START — POWER DEFICIT PROTECTION
@@ -103,80 +180,30 @@ class MicrogridController:
         power_deficit = load_kw - solar_kw
 
         if (
-            power_deficit > (load_kw * self.POWER_DEFICIT_MARGIN)
+            power_deficit > deficit_threshold
             and generator_available
         ):
-            return {
-                "generator_cmd": "START",
-                "battery_mode": "DISCHARGE",
-                "load_shed_level": self.LOAD_SHED_NONE,
-                "state": self.state.value,
-                "safe_mode": False,
-                "reason": (
-                    "Early generator start due to sustained power deficit; "
-                    "preventing rapid SOC collapse and voltage risk"
-                )
-            }
+            return dict(self._ACTION_DEFICIT, state=self._state_str)
 
         # ------------------------------------------------------
-        # 5. STATE TRANSITIONS (SOC-BASED)
+        # 5. STATE TRANSITIONS (SOC-BASED) + STATE ACTIONS
         # ------------------------------------------------------
         if soc < self.SOC_EMERGENCY_MIN:
-            self.state = SystemState.EMERGENCY
-        elif soc < self.SOC_STRESSED_MIN:
-            self.state = SystemState.STRESSED
-        else:
-            self.state = SystemState.NORMAL
+            self._set_state(SystemState.EMERGENCY)
+            if generator_available:
+                return self._ACTION_EMERGENCY_AVAIL.copy()
+            return self._ACTION_EMERGENCY_HOLD.copy()
 
-        # ------------------------------------------------------
-        # 6. STATE ACTIONS
-        # ------------------------------------------------------
-        if self.state == SystemState.NORMAL:
-            return {
-                "generator_cmd": "STOP",
-                "battery_mode": "DISCHARGE",
-                "load_shed_level": self.LOAD_SHED_NONE,
-                "state": self.state.value,
-                "safe_mode": False,
-                "reason": "Battery SOC healthy; normal hospital operation"
-            }
-
-        if self.state == SystemState.STRESSED:
-            return {
-                "generator_cmd": "START",
-                "battery_mode": "DISCHARGE",
-                "load_shed_level": self.LOAD_SHED_T3,
-                "state": self.state.value,
-                "safe_mode": False,
-                "reason": (
-                    "Preventive generator start due to declining SOC; "
-                    "maintaining energy buffer for critical loads"
-                )
-            }
-
-        if self.state == SystemState.EMERGENCY:
-            return {
-                "generator_cmd": "START" if generator_available else "HOLD",
-                "battery_mode": "PROTECT",
-                "load_shed_level": self.LOAD_SHED_T2,
-                "state": self.state.value,
-                "safe_mode": False,
-                "reason": (
-                    "Emergency condition: preserving life-critical hospital loads "
-                    "and preventing inverter starvation"
-                )
-            }
+        if soc < soc_stressed_min:
+            self._set_state(SystemState.STRESSED)
+            return self._ACTION_STRESSED.copy()
+
+        self._set_state(SystemState.NORMAL)
+        return self._ACTION_NORMAL.copy()
 
     # ==========================================================
     # SAFE MODE — NON-BYPASSABLE FAIL-SAFE
     # ==========================================================
     def _safe_mode_action(self, reason):
 
-        return {
-            "generator_cmd": "START",
-            "battery_mode": "PROTECT",
-            "load_shed_level": self.LOAD_SHED_T1,
-            "state": SystemState.SAFE_MODE.value,
-            "safe_mode": True,
-            "reason": reason
-        }
+        return dict(self._ACTION_SAFE_MODE, reason=reason)
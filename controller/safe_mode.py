@@ -1,6 +1,8 @@
 def enforce_safe_mode(sensors):
     """
     Hard safety logic — cannot be overridden.
+
+    sensors is the step's SensorReading.
     """
     actions = {
         "use_battery": True,
@@ -8,7 +10,7 @@ def enforce_safe_mode(sensors):
         "load_shed_level": 3
     }
 
-    if sensors["soc"] < 0.30:
+    if sensors.soc < 0.30:
         actions["use_battery"] = False
         actions["use_generator"] = True
 
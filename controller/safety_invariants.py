@@ -5,6 +5,66 @@ class SafetyViolation(Exception):
     pass
 
 
+_KNOWN_COMMANDS = frozenset(("START", "STOP", "HOLD"))
+
+# Violation code -> message (0 means all invariants hold)
+_MESSAGES = (
+    None,
+    "Invalid load shedding level detected",
+    "Critical loads shed outside SAFE_MODE",
+    "Battery SOC dropped below absolute minimum "
+    "while generator was available",
+    "Generator not started during emergency SOC condition",
+    "SAFE_MODE active but generator not forced ON",
+    "Unknown generator command issued",
+)
+
+
+def _violation_code(soc, gen_start, gen_known, generator_available,
+                    load_shed_level, safe_mode):
+    """
+    Return the first violated invariant as an index into _MESSAGES
+    (0 if all hold). Pure numeric/bool comparisons, checked in order.
+    """
+
+    # --------------------------------------------------
+    # INVARIANT 1 — LIFE-CRITICAL LOADS MUST SURVIVE
+    # --------------------------------------------------
+    if load_shed_level > 3:
+        return 1
+
+    # Tier-0 and Tier-1 loads must remain if any energy exists
+    # (allowed only in SAFE_MODE)
+    if soc > 0.0 and load_shed_level == 3 and not safe_mode:
+        return 2
+
+    # --------------------------------------------------
+    # INVARIANT 2 — BATTERY MUST NOT BE SACRIFICED
+    # --------------------------------------------------
+    if soc < 0.30 and generator_available:
+        return 3
+
+    # --------------------------------------------------
+    # INVARIANT 3 — GENERATOR MUST START BEFORE CRISIS
+    # --------------------------------------------------
+    if soc < 0.40 and generator_available and not gen_start:
+        return 4
+
+    # --------------------------------------------------
+    # INVARIANT 4 — SAFE_MODE IS ABSOLUTE
+    # --------------------------------------------------
+    if safe_mode and not gen_start:
+        return 5
+
+    # --------------------------------------------------
+    # INVARIANT 5 — NO SILENT FAILURE
+    # --------------------------------------------------
+    if not gen_known:
+        return 6
+
+    return 0
+
+
 class SafetyInvariants:
     """
     Formal safety rules for hospital-grade microgrid operation.
@@ -25,50 +85,23 @@ class SafetyInvariants:
         Validate all safety invariants for a single timestep.
         """
 
-        # --------------------------------------------------
-        # INVARIANT 1 — LIFE-CRITICAL LOADS MUST SURVIVE
-        # --------------------------------------------------
-        if load_shed_level > 3:
-            raise SafetyViolation(
-                "Invalid load shedding level detected"
-            )
-
-        # Tier-0 and Tier-1 loads must remain if any energy exists
-        if soc > 0.0 and load_shed_level == 3 and not safe_mode:
-            # Allowed only in SAFE_MODE
-            raise SafetyViolation(
-                "Critical loads shed outside SAFE_MODE"
-            )
-
-        # --------------------------------------------------
-        # INVARIANT 2 — BATTERY MUST NOT BE SACRIFICED
-        # --------------------------------------------------
-        if soc < 0.30 and generator_available:
-            raise SafetyViolation(
-                "Battery SOC dropped below absolute minimum "
-                "while generator was available"
-            )
-
-        # --------------------------------------------------
-        # INVARIANT 3 — GENERATOR MUST START BEFORE CRISIS
-        # --------------------------------------------------
-        if soc < 0.40 and generator_available and generator_cmd != "START":
-            raise SafetyViolation(
-                "Generator not started during emergency SOC condition"
-            )
-
-        # --------------------------------------------------
-        # INVARIANT 4 — SAFE_MODE IS ABSOLUTE
-        # --------------------------------------------------
-        if safe_mode and generator_cmd != "START":
-            raise SafetyViolation(
-                "SAFE_MODE active but generator not forced ON"
-            )
-
-        # --------------------------------------------------
-        # INVARIANT 5 — NO SILENT FAILURE
-        # --------------------------------------------------
-        if generator_cmd not in ["START", "STOP", "HOLD"]:
-            raise SafetyViolation(
-                "Unknown generator command issued"
-            )
+        # Common case: no shedding beyond level 2, not in SAFE_MODE, a known
+        # command and a healthy battery (or no generator) — nothing can fire.
+        if (
+            load_shed_level <= 2
+            and not safe_mode
+            and generator_cmd in _KNOWN_COMMANDS
+            and (soc >= 0.40 or not generator_available)
+        ):
+            return
+
+        code = _violation_code(
+            soc,
+            generator_cmd == "START",
+            generator_cmd in _KNOWN_COMMANDS,
+            generator_available,
+            load_shed_level,
+            safe_mode,
+        )
+        if code:
+            raise SafetyViolation(_MESSAGES[code])
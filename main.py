@@ -1,3 +1,8 @@
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from components.solar import SolarPV
 from components.battery import Battery
 from components.generator import DieselGenerator
@@ -33,7 +38,7 @@ if RUN_HORIZON is not None:
 	solar_profile = solar_profile[:RUN_HORIZON]
 
 
-def build_sim():
+def build_sim(log_dir="logs"):
 	solar = SolarPV(max_power_kw=SOLAR_MAX_POWER_KW)
 	battery = Battery(
 		capacity_kwh=BATTERY_CAPACITY_KWH,
@@ -43,27 +48,72 @@ def build_sim():
 	)
 	generator = DieselGenerator(max_power_kw=GENERATOR_MAX_POWER_KW)
 	controller = MicrogridController()
-	return MicrogridSimulator(solar, battery, generator, controller, forecaster)
-
-# Normal run
-sim_normal = build_sim()
-results_normal = sim_normal.run(load, solar_profile)
-summary_normal = getattr(results_normal, "attrs", {}).get("summary", {})
-print("NORMAL RUN SUMMARY:", summary_normal)
-blackouts_normal = results_normal[results_normal["blackout"]]
-if len(blackouts_normal) > 0:
-	print("NORMAL RUN BLACKOUT TIMESTEPS:")
-	blackouts_normal = blackouts_normal.copy()
-	blackouts_normal["supply_calc_kw"] = (
-		blackouts_normal["solar_kw"]
-		+ blackouts_normal["generator_kw"]
-		+ blackouts_normal["battery_kw"]
-	)
-	blackouts_normal["deficit_kw"] = (
-		blackouts_normal["served_load_kw"] - blackouts_normal["supply_calc_kw"]
-	)
-	print(
-		blackouts_normal[[
+	return MicrogridSimulator(solar, battery, generator, controller, forecaster, log_dir=log_dir)
+
+
+# Simulated cyber attack run (SOC spoofing triggers SAFE_MODE)
+# Use a realistic bounded spoof (0..1) and detect via secure-channel mismatch.
+attack = {"type": "soc_spoof", "start": 36, "end": 72, "spoof_value": 0.95}
+
+# Independent runs; each one logs to its own logs/<name>/ directory so the
+# worker processes never append to the same file.
+SCENARIOS = [
+	{"name": "normal", "attack": None},
+	{"name": "attack", "attack": attack},
+]
+
+
+def log_dir_for(scenario):
+	return os.path.join("logs", scenario["name"])
+
+
+def last_line(path, block_size=4096):
+	"""
+	Last line of a text file, read backwards from the end in blocks.
+	"""
+	with open(path, "rb") as f:
+		pos = f.seek(0, os.SEEK_END)
+		tail = b""
+		while pos > 0:
+			step = min(block_size, pos)
+			pos -= step
+			f.seek(pos)
+			tail = f.read(step) + tail
+			# A newline before the final byte means the last line is complete
+			if b"\n" in tail[:-1]:
+				break
+	lines = tail.splitlines()
+	return lines[-1].decode("utf-8") if lines else ""
+
+
+def run_one(scenario):
+	"""
+	Build a fresh simulator and run one scenario (top-level so it pickles).
+
+	Returns the results and the run's console output, which the parent
+	prints in scenario order instead of letting workers interleave it.
+	"""
+	sim = build_sim(log_dir=log_dir_for(scenario))
+	out = io.StringIO()
+	with contextlib.redirect_stdout(out):
+		results = sim.run(load, solar_profile, attack=scenario["attack"])
+	return results, out.getvalue()
+
+
+def main():
+	with ProcessPoolExecutor(max_workers=min(len(SCENARIOS), os.cpu_count() or 1)) as ex:
+		(results_normal, output_normal), (results_attack, output_attack) = ex.map(
+			run_one, SCENARIOS
+		)
+
+	# Normal run
+	print(output_normal, end="")
+	summary_normal = getattr(results_normal, "attrs", {}).get("summary", {})
+	print("NORMAL RUN SUMMARY:", summary_normal)
+	# Project the printed columns before masking, so only they are copied
+	blackouts_normal = results_normal.loc[
+		results_normal["blackout"].to_numpy(),
+		[
 			"time",
 			"load_kw",
 			"served_load_kw",
@@ -71,40 +121,64 @@ if len(blackouts_normal) > 0:
 			"generator_kw",
 			"battery_kw",
 			"battery_soc",
-			"supply_calc_kw",
-			"deficit_kw",
 			"generator_cmd",
 			"state",
 			"reason",
-		]].to_string(index=False)
-	)
+		],
+	]
+	if len(blackouts_normal) > 0:
+		print("NORMAL RUN BLACKOUT TIMESTEPS:")
+		blackouts_normal = blackouts_normal.copy()
+		blackouts_normal["supply_calc_kw"] = (
+			blackouts_normal["solar_kw"]
+			+ blackouts_normal["generator_kw"]
+			+ blackouts_normal["battery_kw"]
+		)
+		blackouts_normal["deficit_kw"] = (
+			blackouts_normal["served_load_kw"] - blackouts_normal["supply_calc_kw"]
+		)
+		print(
+			blackouts_normal[[
+				"time",
+				"load_kw",
+				"served_load_kw",
+				"solar_kw",
+				"generator_kw",
+				"battery_kw",
+				"battery_soc",
+				"supply_calc_kw",
+				"deficit_kw",
+				"generator_cmd",
+				"state",
+				"reason",
+			]].to_string(index=False)
+		)
 
-# Simulated cyber attack run (SOC spoofing triggers SAFE_MODE)
-# Use a realistic bounded spoof (0..1) and detect via secure-channel mismatch.
-attack = {"type": "soc_spoof", "start": 36, "end": 72, "spoof_value": 0.95}
-sim_attack = build_sim()
-results_attack = sim_attack.run(load, solar_profile, attack=attack)
-summary_attack = getattr(results_attack, "attrs", {}).get("summary", {})
-print("ATTACK RUN SUMMARY:", summary_attack)
-
-# Proof that AI is actively used
-ai_triggers = int(summary_attack.get("ai_trigger_count", 0))
-ai_forecasts = int(summary_attack.get("ai_forecast_count", 0))
-print(f"AI STATUS: forecasts_generated={ai_forecasts}, ai_triggered_decisions={ai_triggers}")
-
-# Proof that cyber detection is active
-cyber_count = summary_attack.get("cyber_alert_count", 0)
-cyber_first = summary_attack.get("cyber_first_timestep", None)
-print(f"CYBER STATUS: cyber_alert_timesteps={cyber_count}, first_alert_timestep={cyber_first}")
-
-try:
-	with open("logs/cyber_events.txt", "r", encoding="utf-8") as f:
-		last_line = ""
-		for line in f:
-			last_line = line
-	if last_line.strip():
-		print("LATEST CYBER EVENT:", last_line.strip())
-except FileNotFoundError:
-	print("LATEST CYBER EVENT: (no cyber_events.txt found)")
-
-print(results_attack.tail(5))
+	# Attack run
+	print(output_attack, end="")
+	summary_attack = getattr(results_attack, "attrs", {}).get("summary", {})
+	print("ATTACK RUN SUMMARY:", summary_attack)
+
+	# Proof that AI is actively used
+	ai_triggers = int(summary_attack.get("ai_trigger_count", 0))
+	ai_forecasts = int(summary_attack.get("ai_forecast_count", 0))
+	print(f"AI STATUS: forecasts_generated={ai_forecasts}, ai_triggered_decisions={ai_triggers}")
+
+	# Proof that cyber detection is active
+	cyber_count = summary_attack.get("cyber_alert_count", 0)
+	cyber_first = summary_attack.get("cyber_first_timestep", None)
+	print(f"CYBER STATUS: cyber_alert_timesteps={cyber_count}, first_alert_timestep={cyber_first}")
+
+	cyber_log = os.path.join(log_dir_for(SCENARIOS[1]), "cyber_events.txt")
+	try:
+		latest = last_line(cyber_log).strip()
+		if latest:
+			print("LATEST CYBER EVENT:", latest)
+	except FileNotFoundError:
+		print("LATEST CYBER EVENT: (no cyber_events.txt found)")
+
+	print(results_attack.tail(5))
+
+
+if __name__ == "__main__":
+	main()
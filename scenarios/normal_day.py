@@ -1,8 +1,42 @@
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_profiles():
-    load = pd.read_csv("data/load_history.csv")
-    solar = pd.read_csv("data/solar_history.csv")
+LOAD_CSV = "data/load_history.csv"
+SOLAR_CSV = "data/solar_history.csv"
+
+
+def _cached_column(csv_path, column, cache=True):
+    """
+    One CSV column as a float64 array, cached next to the CSV as .npy.
+
+    The cache is rebuilt whenever the CSV is newer; cached reads are
+    memory-mapped (read-only).
+    """
+    npy_path = os.path.splitext(csv_path)[0] + ".npy"
+    if (
+        cache
+        and os.path.exists(npy_path)
+        and os.path.getmtime(npy_path) >= os.path.getmtime(csv_path)
+    ):
+        return np.load(npy_path, mmap_mode="r")
+
+    values = np.ascontiguousarray(
+        pd.read_csv(csv_path, usecols=[column])[column].to_numpy(dtype=np.float64)
+    )
+    if cache:
+        # Write-then-rename so a concurrent reader never sees a partial file
+        tmp_path = f"{npy_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp_path, npy_path)
+    return values
+
+
+def load_profiles(cache=True):
+    load = _cached_column(LOAD_CSV, "load_kw", cache=cache)
+    solar = _cached_column(SOLAR_CSV, "solar_kw", cache=cache)
 
     # Return as time series (kW)
-    return load["load_kw"].values, solar["solar_kw"].values
+    return load, solar
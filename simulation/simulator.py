@@ -1,40 +1,351 @@
 import os
 
+import numpy as np
 import pandas as pd
 
-from controller.cyber_security_manager import CyberSecurityManager
+from controller.cyber_security_manager import CyberSecurityManager, SensorReading
+from controller.microgrid_controller import SystemState
 from controller.safe_mode import enforce_safe_mode
 from controller.safety_invariants import SafetyInvariants
-from utils.logger import log_system
-from utils.validator import validate_phase5
+from utils.logger import format_system_line, write_system_lines
+from utils.validator import validate_phase5_vec
 
 
 CRITICAL_LOAD_KW = 30  # life-critical hospital load
 POWER_EPS_KW = 1e-6
 
+# Result columns, in the order of the returned DataFrame
+RESULT_COLUMNS = (
+    "time",
+    "load_kw",
+    "sensed_load_kw",
+    "solar_kw",
+    "sensed_solar_kw",
+    "generator_kw",
+    "battery_kw",
+    "battery_charge_kw",
+    "battery_soc",
+    "battery_soc_pct",
+    "generator_cmd",
+    "generator_on",
+    "state",
+    "cyber_alert",
+    "cyber_anomaly_now",
+    "cyber_reason",
+    "attack_active",
+    "attack_types",
+    "ai_forecast",
+    "ai_triggered",
+    "ai_forecast_t_plus_1_kw",
+    "ai_forecast_avg_6h_kw",
+    "load_shed_level",
+    "served_load_kw",
+    "blackout",
+    "critical_served",
+    "unsafe",
+    "validator_ok",
+    "reason",
+)
+
+# Steps of load history kept for the forecaster (it needs >= 24 before use)
+HISTORY_WINDOW = 24
+
+# Hours of load the AI forecaster predicts ahead
+FORECAST_HOURS = 6
+
+# Precision of the float result columns (kW and SOC); the run itself and its
+# summary work in float64, only the returned frame is narrowed
+RESULT_FLOAT_DTYPE = np.float32
+
+# Fraction of non-critical demand shed at each load_shed_level (0..3)
+SHED_FRACTION = (0.0, 0.10, 0.30, 1.0)
+
+# Fixed vocabularies of the categorical result columns
+STATES = tuple(s.value for s in SystemState)
+GENERATOR_CMDS = ("START", "STOP", "HOLD")
+
+
+def _as_array(profile):
+    """
+    Profile (DataFrame -> first column, Series, list or array) as a flat,
+    contiguous float64 array.
+    """
+    if isinstance(profile, pd.DataFrame):
+        profile = profile.iloc[:, 0]
+    if isinstance(profile, pd.Series):
+        return profile.to_numpy(dtype=np.float64)
+    # ravel() also flattens (n, 1) column arrays and copies strided views
+    return np.asarray(profile, dtype=np.float64).ravel()
+
+
+def _attack_traces(attack, load_arr, solar_arr):
+    """
+    Resolve `attack` (a dict, a list of dicts or None) into per-step traces.
+
+    Attack windows and parameters are fixed for the run, so everything the
+    loop needs is known up front. Where attacks overlap, the later one in
+    the list wins for the signal it spoofs.
+
+    Returns (sensed_load, sensed_solar, soc_spoof, any_active, attack_types)
+    as per-step arrays: the spoofable load/solar readings, the spoofed SOC
+    (None where the real SOC is reported), whether any attack is active, and
+    the sorted, comma-joined attack types active at each step.
+    """
+    horizon = len(load_arr)
+    if isinstance(attack, list):
+        items = attack
+    elif isinstance(attack, dict):
+        items = [attack]
+    else:
+        items = []
+
+    steps = np.arange(horizon)
+    sensed_load = load_arr.copy()
+    sensed_solar = solar_arr.copy()
+    soc_spoof = np.full(horizon, None, dtype=object)
+    any_active = np.zeros(horizon, dtype=bool)
+    labels, label_masks = [], []
+
+    for a in items:
+        if not isinstance(a, dict):
+            continue
+        a_type = a.get("type")
+        start = int(a.get("start", 0))
+        end = int(a.get("end", -1))
+
+        active = steps >= start
+        if end >= 0:
+            active &= steps <= end
+        any_active |= active
+
+        if a_type:
+            labels.append(str(a_type))
+            label_masks.append(active)
+
+        # Values are only read (and coerced) for steps the attack covers;
+        # one outside the horizon may carry placeholders
+        if not active.any():
+            continue
+
+        if a_type == "soc_spoof":
+            if "spoof_value" in a:
+                soc_spoof[active] = float(a["spoof_value"])
+        elif a_type == "load_spoof":
+            scale = float(a.get("scale", 1.0))
+            offset = float(a.get("offset", 0.0))
+            sensed_load[active] = (load_arr[active] * scale) + offset
+        elif a_type == "solar_spoof":
+            scale = float(a.get("scale", 1.0))
+            offset = float(a.get("offset", 0.0))
+            sensed_solar[active] = (solar_arr[active] * scale) + offset
+
+    # One label string per distinct combination of active attacks
+    if labels:
+        combos, combo_of_step = np.unique(
+            np.stack(label_masks, axis=1), axis=0, return_inverse=True
+        )
+        combo_labels = [
+            ",".join(sorted({label for label, on in zip(labels, row) if on}))
+            for row in combos
+        ]
+        attack_types = np.array(combo_labels, dtype=object)[combo_of_step.ravel()]
+    else:
+        attack_types = np.full(horizon, "", dtype=object)
+
+    return sensed_load, sensed_solar, soc_spoof, any_active, attack_types
+
+
+class _RunBuffers:
+    """
+    Structure-of-arrays for the values run() computes step by step.
+
+    One preallocated column per field, written at index t. Columns already
+    known before the loop (inputs, attack traces) are passed to to_frame().
+    Fixed-vocabulary strings are stored as int8 category codes; a value
+    outside the vocabulary (e.g. a custom controller state) is appended to
+    this run's categories by add_category(), so nothing is lost. Free-text
+    strings become categoricals when the frame is built.
+    """
+
+    FLOAT = (
+        "generator_kw",
+        "battery_kw",
+        "battery_charge_kw",
+        "battery_soc",
+        "ai_forecast_t_plus_1_kw",
+        "ai_forecast_avg_6h_kw",
+        "served_load_kw",
+    )
+    INT = ("load_shed_level",)
+    BOOL = (
+        "generator_on",
+        "cyber_alert",
+        "cyber_anomaly_now",
+        "ai_forecast",
+        "ai_triggered",
+        "blackout",
+        "critical_served",
+        "unsafe",
+        "validator_ok",
+    )
+    CODED = {"generator_cmd": GENERATOR_CMDS, "state": STATES}
+    OBJECT = ("cyber_reason", "reason")
+
+    __slots__ = FLOAT + INT + BOOL + tuple(CODED) + OBJECT + ("codes",)
+
+    def __init__(self, horizon):
+        # Floats start as NaN: the forecast columns are only written when a
+        # forecast exists.
+        for name in self.FLOAT:
+            setattr(self, name, np.full(horizon, np.nan))
+        for name in self.INT:
+            setattr(self, name, np.zeros(horizon, dtype=np.int64))
+        for name in self.BOOL:
+            setattr(self, name, np.zeros(horizon, dtype=bool))
+        for name in self.CODED:
+            setattr(self, name, np.full(horizon, -1, dtype=np.int8))
+        # value -> code per coded column, in category order
+        self.codes = {
+            name: {value: i for i, value in enumerate(vocab)}
+            for name, vocab in self.CODED.items()
+        }
+        for name in self.OBJECT:
+            setattr(self, name, np.empty(horizon, dtype=object))
+
+    def add_category(self, name, value):
+        """
+        Code for a value not yet in column name's categories, appending it.
+        None stays code -1 (missing), as categories cannot hold it.
+        """
+        if value is None:
+            return -1
+        codes = self.codes[name]
+        code = len(codes)
+        if code > np.iinfo(np.int8).max:
+            raise ValueError(f"Too many distinct {name} values in one run")
+        codes[value] = code
+        return code
+
+    def categories(self, name):
+        return list(self.codes[name])
+
+    def system_log_lines(self, stop, every, load_kw, solar_kw):
+        """
+        System-log lines for steps 0, every, 2 * every, ... below stop.
+        """
+        idx = np.arange(0, stop, every)
+        supply_kw = solar_kw[idx] + self.generator_kw[idx] + self.battery_kw[idx]
+        # code -1 (no state recorded) maps to None
+        states = np.array(self.categories("state") + [None], dtype=object)[
+            self.state[idx]
+        ]
+        return [
+            format_system_line(
+                t=t,
+                state=state,
+                soc=soc,
+                supply=supply,
+                load=load,
+                served_load=served_load,
+                blackout=blackout,
+                critical_served=critical_served,
+                cyber_alert=cyber_alert,
+                unsafe=unsafe,
+                validator_ok=validator_ok,
+                ai_forecast=ai_forecast,
+                ai_triggered=ai_triggered,
+                reason=reason,
+            )
+            for (
+                t, state, soc, supply, load, served_load, blackout,
+                critical_served, cyber_alert, unsafe, validator_ok,
+                ai_forecast, ai_triggered, reason,
+            ) in zip(
+                idx.tolist(),
+                states.tolist(),
+                self.battery_soc[idx].tolist(),
+                supply_kw.tolist(),
+                load_kw[idx].tolist(),
+                self.served_load_kw[idx].tolist(),
+                self.blackout[idx].tolist(),
+                self.critical_served[idx].tolist(),
+                self.cyber_alert[idx].tolist(),
+                self.unsafe[idx].tolist(),
+                self.validator_ok[idx].tolist(),
+                self.ai_forecast[idx].tolist(),
+                self.ai_triggered[idx].tolist(),
+                self.reason[idx].tolist(),
+            )
+        ]
+
+    def to_frame(self, **known):
+        for name in self.CODED:
+            known[name] = pd.Categorical.from_codes(
+                getattr(self, name), categories=self.categories(name)
+            )
+        for name in self.OBJECT:
+            known[name] = pd.Categorical(getattr(self, name))
+        columns = {}
+        for name in RESULT_COLUMNS:
+            col = known[name] if name in known else getattr(self, name)
+            if isinstance(col, np.ndarray) and col.dtype == np.float64:
+                col = col.astype(RESULT_FLOAT_DTYPE)
+            columns[name] = col
+        # The columns are adopted as-is (copy=False): every array here is
+        # owned by this run (the float ones are fresh from astype), so
+        # nothing else can write through them.
+        return pd.DataFrame(columns, copy=False)
+
 
 class MicrogridSimulator:
-    def __init__(self, solar, battery, generator, controller, forecaster=None):
+    __slots__ = (
+        "solar",
+        "battery",
+        "generator",
+        "controller",
+        "forecaster",
+        "log_dir",
+        "cyber",
+        "_hist_t",
+        "_hist_load",
+        "_hist_len",
+        "_win_t",
+        "_win_load",
+        "_history_df",
+        "_prev_cyber_alert",
+        "_prev_blackout",
+        "_prev_critical_lost",
+        "_prev_unsafe",
+    )
+
+    def __init__(
+        self, solar, battery, generator, controller, forecaster=None, log_dir="logs"
+    ):
         self.solar = solar
         self.battery = battery
         self.generator = generator
         self.controller = controller
         self.forecaster = forecaster
-        self.history = []
-        self.cyber = CyberSecurityManager()
+        # Ring buffer of the last HISTORY_WINDOW (timestamp, load_kw) samples;
+        # _hist_len counts every sample ever stored (kept across runs).
+        self._hist_t = np.zeros(HISTORY_WINDOW, dtype=np.int64)
+        self._hist_load = np.zeros(HISTORY_WINDOW, dtype=np.float64)
+        self._hist_len = 0
+        # Forecaster input: two window arrays refilled oldest-first in place,
+        # plus a frame over them (copy=False keeps them shared) for
+        # forecasters that only implement predict_next(history_df).
+        self._win_t = np.zeros(HISTORY_WINDOW, dtype=np.int64)
+        self._win_load = np.zeros(HISTORY_WINDOW, dtype=np.float64)
+        self._history_df = pd.DataFrame(
+            {"timestamp": self._win_t, "load_kw": self._win_load}, copy=False
+        )
+        self.log_dir = log_dir
+        self.cyber = CyberSecurityManager(log_dir=log_dir)
         self._prev_cyber_alert = False
         self._prev_blackout = False
         self._prev_critical_lost = False
         self._prev_unsafe = False
 
-    def _get_value(self, profile, t):
-        if isinstance(profile, pd.DataFrame):
-            return profile.iloc[t, 0]
-        elif isinstance(profile, pd.Series):
-            return profile.iloc[t]
-        else:
-            return profile[t]
-
     def run(
         self,
         load_profile,
@@ -47,381 +358,419 @@ class MicrogridSimulator:
         log_every_n=1,
         reset_logs=False,
         quiet=False,
+        forecast_stride=1,
     ):
-        results = []
+        """
+        Simulate the microgrid over len(load_profile) timesteps.
+
+        forecast_stride: re-run the AI forecaster only every N steps; in
+        between, the last forecast is shifted forward by the elapsed steps.
+        """
         horizon = len(load_profile)
+        forecast_stride = max(1, int(forecast_stride))
+        last_forecast = None
+        last_forecast_t = 0
 
         if reset_logs:
-            os.makedirs("logs", exist_ok=True)
+            os.makedirs(self.log_dir, exist_ok=True)
             if write_system_log:
                 try:
-                    os.remove("logs/system_log.txt")
+                    os.remove(os.path.join(self.log_dir, "system_log.txt"))
                 except FileNotFoundError:
                     pass
             if write_cyber_log:
+                self.cyber.close()
                 try:
-                    os.remove("logs/cyber_events.txt")
+                    os.remove(os.path.join(self.log_dir, "cyber_events.txt"))
                 except FileNotFoundError:
                     pass
 
-        blackout_count = 0
-        critical_lost_count = 0
-        unsafe_count = 0
-        validator_fail_count = 0
-        cyber_blackout_count = 0
-        # cyber_alert is latched once detected; track both triggers and active steps
-        cyber_alert_count = 0  # number of alert trigger events (rising edge)
-        cyber_alert_active_steps = 0  # number of timesteps alert is active
-        cyber_anomaly_steps = 0  # number of timesteps anomaly is detected (instantaneous)
-        attack_active_steps = 0
-        cyber_first_timestep = None
-        ai_forecast_count = 0
-        ai_trigger_count = 0
-
-        for t in range(horizon):
-            true_load_kw = float(self._get_value(load_profile, t))
-            solar_kw_raw = self._get_value(solar_profile, t)
-            solar_kw = self.solar.get_power(solar_kw_raw)
-
-            # What the controller/AI "sees" (can be spoofed)
-            sensed_load_kw = true_load_kw
-            sensed_solar_kw = float(solar_kw)
-
-            # --------------------------------------------------
-            # SENSOR DATA & CYBER DETECTION
-            # --------------------------------------------------
-            measured_soc = self.battery.soc
-
-            # Support either a single dict attack or a list of attacks
-            attacks = []
-            if isinstance(attack, list):
-                attacks = attack
-            elif isinstance(attack, dict):
-                attacks = [attack]
-
-            attack_active = False
-            active_attack_types = []
-
-            # Optional simulated cyber attacks
-            for a in attacks:
-                if not isinstance(a, dict):
-                    continue
-                a_type = a.get("type")
-                start = int(a.get("start", 0))
-                end = int(a.get("end", -1))
-                if not (start <= t and (end < 0 or t <= end)):
-                    continue
-
-                attack_active = True
-                if a_type:
-                    active_attack_types.append(str(a_type))
-
-                if a_type == "soc_spoof":
-                    measured_soc = float(a.get("spoof_value", measured_soc))
-                elif a_type == "load_spoof":
-                    scale = float(a.get("scale", 1.0))
-                    offset = float(a.get("offset", 0.0))
-                    sensed_load_kw = (true_load_kw * scale) + offset
-                elif a_type == "solar_spoof":
-                    scale = float(a.get("scale", 1.0))
-                    offset = float(a.get("offset", 0.0))
-                    sensed_solar_kw = (float(solar_kw) * scale) + offset
-
-            if attack_active:
-                attack_active_steps += 1
-
-            sensor_data = {
-                "soc": measured_soc,
-                # Redundant secure channel (e.g., BMS local measurement)
-                "soc_secure": self.battery.soc,
-                "load_kw": sensed_load_kw,
-                "load_kw_secure": true_load_kw,
-                "solar_kw": sensed_solar_kw,
-                "solar_kw_secure": float(solar_kw),
-            }
-
-            cyber_alert = self.cyber.evaluate(sensor_data)
-            cyber_anomaly_now = bool(getattr(self.cyber, "anomaly_now", False))
-            cyber_reason = getattr(self.cyber, "reason", None)
-
-            if cyber_anomaly_now:
-                cyber_anomaly_steps += 1
-
-            if cyber_alert:
-                cyber_alert_active_steps += 1
-                if not self._prev_cyber_alert:
-                    cyber_alert_count += 1
-                    if cyber_first_timestep is None:
-                        cyber_first_timestep = t
-
-            # Cyber event logging (configurable)
-            if write_cyber_log:
-                mode = str(cyber_log_mode or "transition").strip().lower()
-                if mode not in {"transition", "anomaly", "active"}:
-                    mode = "transition"
-
-                log_this_step = False
-                if mode == "transition":
-                    log_this_step = cyber_alert and (not self._prev_cyber_alert)
-                elif mode == "anomaly":
-                    log_this_step = cyber_anomaly_now
-                elif mode == "active":
-                    log_this_step = cyber_alert
-
-                if log_this_step:
-                    msg = cyber_reason or "Cyber anomaly detected"
-                    self.cyber.log_event(t, f"CYBER EVENT: {msg}")
-
-            # Console note only when entering SAFE_MODE
-            if cyber_alert and (not self._prev_cyber_alert):
-                if not quiet:
-                    print("SAFE MODE ACTIVE – degraded but stable")
-
-            # --------------------------------------------------
-            # STORE HISTORY FOR AI (PASSIVE ONLY)
-            # --------------------------------------------------
-            self.history.append({
-                "timestamp": t,
-                "load_kw": true_load_kw
-            })
-
-            # --------------------------------------------------
-            # AI LOAD FORECAST (ADVISORY)
-            # --------------------------------------------------
-            load_forecast = None
-            if self.forecaster and len(self.history) >= 24:
-                history_df = pd.DataFrame(self.history)
-                load_forecast = self.forecaster.predict_next(
-                    history_df,
-                    hours_ahead=6
-                )
-
-            ai_forecast_available = load_forecast is not None
-            if ai_forecast_available:
-                ai_forecast_count += 1
-
-            forecast_t_plus_1_kw = None
-            forecast_avg_6h_kw = None
-            if ai_forecast_available and len(load_forecast) > 0:
-                forecast_t_plus_1_kw = float(load_forecast[0])
-                forecast_avg_6h_kw = float(sum(load_forecast) / len(load_forecast))
-
-            # --------------------------------------------------
-            # CONTROLLER DECISION
-            # --------------------------------------------------
-            decision = self.controller.decide(
-                solar_kw=sensed_solar_kw,
-                load_kw=sensed_load_kw,
-                battery=self.battery,
-                load_forecast=load_forecast,
-                cyber_anomaly=cyber_alert
+        # Summary counts are taken from the recorded columns after the loop;
+        # rising edges need the alert state this run starts from.
+        prev_cyber_alert = self._prev_cyber_alert
+
+        # --------------------------------------------------
+        # WHOLE-HORIZON PRECOMPUTE (NOTHING HERE DEPENDS ON SOC)
+        # --------------------------------------------------
+        load_arr = _as_array(load_profile)
+        solar_arr = self.solar.get_power(_as_array(solar_profile)[:horizon])
+
+        # We always preserve CRITICAL_LOAD_KW, then shed non-critical demand.
+        critical_arr = np.minimum(load_arr, CRITICAL_LOAD_KW)
+        non_critical_arr = np.maximum(0.0, load_arr - critical_arr)
+
+        # Served load for every step at every shed level: (horizon, 4) table,
+        # so the loop only has to pick the column the controller chose.
+        served_by_level = (
+            critical_arr[:, None]
+            + non_critical_arr[:, None] * (1.0 - np.asarray(SHED_FRACTION))
+        )
+
+        # Plain floats for the sequential loop (cheaper than NumPy scalars)
+        load_list = load_arr.tolist()
+        solar_list = solar_arr.tolist()
+        served_by_level_list = served_by_level.tolist()
+
+        # What the controller/AI "sees" (can be spoofed), for the whole run
+        (
+            sensed_load_arr,
+            sensed_solar_arr,
+            soc_spoof_arr,
+            attack_active_arr,
+            attack_types_arr,
+        ) = _attack_traces(attack, load_arr, solar_arr)
+        sensed_load_list = sensed_load_arr.tolist()
+        sensed_solar_list = sensed_solar_arr.tolist()
+        soc_spoof_list = soc_spoof_arr.tolist()
+
+        # Per-step outputs, one preallocated column each
+        buf = _RunBuffers(horizon)
+        state_codes = buf.codes["state"]
+        cmd_codes = buf.codes["generator_cmd"]
+
+        # Sequential part: SOC feeds the next step's cyber check and decision.
+        # Bind the hot objects/methods once so the loop body uses fast locals.
+        battery = self.battery
+        generator = self.generator
+        gen_max_kw = generator.max_power_kw
+        discharge = battery.discharge
+        charge = battery.charge
+        cyber = self.cyber
+        evaluate = cyber.evaluate
+        decide = self.controller.decide
+        check = SafetyInvariants.check
+        # Array-based forecasters skip the history DataFrame entirely
+        predict_arrays = getattr(self.forecaster, "predict_arrays", None)
+
+        # Forecasters with predict_batch score every step of this run in one
+        # call; the forecast at t is then the slice ending at t (for windows
+        # lying wholly in this run; earlier steps fall back to the calls above).
+        batch_forecast = None
+        if self.forecaster and hasattr(self.forecaster, "predict_batch"):
+            batch_forecast = self.forecaster.predict_batch(
+                np.arange(horizon), load_arr
             )
 
-            reason = decision.get("reason", "")
-            ai_triggered = "Predictive generator start" in reason
-            if ai_triggered:
-                ai_trigger_count += 1
-
-            # --------------------------------------------------
-            # SAFE MODE OVERRIDE (NON-BYPASSABLE)
-            # --------------------------------------------------
-            if cyber_alert:
-                safe_actions = enforce_safe_mode(sensor_data)
-                decision["generator_cmd"] = "START"
-                decision["state"] = "SAFE_MODE"
-                decision["load_shed_level"] = safe_actions.get("load_shed_level", 3)
-                decision["use_battery"] = safe_actions.get("use_battery", True)
-                decision["use_generator"] = safe_actions.get("use_generator", True)
-            else:
-                decision.setdefault("use_battery", True)
-                decision.setdefault("use_generator", True)
-
-            load_shed_level = int(decision.get("load_shed_level", 0))
-
-            # --------------------------------------------------
-            # LOAD SHEDDING (GRACEFUL DEGRADATION)
-            # --------------------------------------------------
-            # We always preserve CRITICAL_LOAD_KW, then shed non-critical demand.
-            # NOTE: dispatch is based on true physical demand, not spoofed sensors
-            load_kw = true_load_kw
-            critical_demand_kw = min(load_kw, CRITICAL_LOAD_KW)
-            non_critical_demand_kw = max(0.0, load_kw - critical_demand_kw)
-
-            if load_shed_level <= 0:
-                shed_fraction = 0.0
-            elif load_shed_level == 1:
-                shed_fraction = 0.10
-            elif load_shed_level == 2:
-                shed_fraction = 0.30
-            else:
-                shed_fraction = 1.0
-
-            served_non_critical_kw = non_critical_demand_kw * (1.0 - shed_fraction)
-            served_load_kw = critical_demand_kw + served_non_critical_kw
-
-            # --------------------------------------------------
-            # APPLY GENERATOR COMMAND
-            # --------------------------------------------------
-            if decision["generator_cmd"] == "START":
-                self.generator.start()
-            elif decision["generator_cmd"] == "STOP":
-                self.generator.stop()
-
-            # --------------------------------------------------
-            # POWER BALANCE (HOSPITAL-GRADE)
-            # --------------------------------------------------
-            # Dispatch generator up to the remaining served load.
-            remaining_kw = max(0.0, served_load_kw - solar_kw)
-            gen_kw = 0.0
-            if self.generator.is_on and decision.get("use_generator", True):
-                gen_kw = min(self.generator.max_power_kw, remaining_kw)
-                remaining_kw = max(0.0, remaining_kw - gen_kw)
-
-            # Dispatch battery for any remaining deficit, but never violate safety.
-            discharged_kw = 0.0
-            if remaining_kw > 0 and decision.get("use_battery", True):
-                discharged_kw = self.battery.discharge(remaining_kw, min_soc=0.30)
-
-            supply_kw = solar_kw + gen_kw + discharged_kw
-            blackout = (supply_kw + POWER_EPS_KW) < served_load_kw
-
-            # --------------------------------------------------
-            # CHARGE BATTERY FROM SURPLUS (REALISTIC OPERATION)
-            # --------------------------------------------------
-            # If solar exceeds served load, store the excess (up to charge limit).
-            battery_charge_kw = 0.0
-            excess_kw = max(0.0, solar_kw - served_load_kw)
-            if excess_kw > 0 and decision.get("use_battery", True):
-                # Battery.charge returns energy (kWh); with dt=1 this matches kW numerically.
-                battery_charge_kw = float(self.battery.charge(excess_kw))
-
-            # --------------------------------------------------
-            # CRITICAL LOAD GUARANTEE
-            # --------------------------------------------------
-            critical_served = supply_kw >= CRITICAL_LOAD_KW
-
-            if not critical_served:
-                critical_lost_count += 1
-                if not self._prev_critical_lost:
-                    if not quiet:
-                        print("CRITICAL LOAD LOST")
+        # System log lines (formatted from the recorded columns) and cyber
+        # events are written after the loop in one go, also when a safety
+        # violation aborts the run part-way: steps_done bounds what counts.
+        steps_done = 0
+        cyber_events = []
+        log_every_n = abs(int(log_every_n or 0))  # t % -n == 0 iff t % n == 0
+        write_system_log = bool(write_system_log) and log_every_n != 0
+
+        cyber_log_mode = str(cyber_log_mode or "transition").strip().lower()
+        if cyber_log_mode not in {"transition", "anomaly", "active"}:
+            cyber_log_mode = "transition"
+
+        try:
+            for t in range(horizon):
+                true_load_kw = load_list[t]
+                solar_kw = solar_list[t]
+
+                # What the controller/AI "sees" (can be spoofed)
+                sensed_load_kw = sensed_load_list[t]
+                sensed_solar_kw = sensed_solar_list[t]
+
+                # --------------------------------------------------
+                # SENSOR DATA & CYBER DETECTION
+                # --------------------------------------------------
+                measured_soc = soc_spoof_list[t]
+                if measured_soc is None:
+                    measured_soc = battery.soc
+
+                sensor_data = SensorReading(
+                    soc=measured_soc,
+                    # Redundant secure channel (e.g., BMS local measurement)
+                    soc_secure=battery.soc,
+                    load_kw=sensed_load_kw,
+                    load_kw_secure=true_load_kw,
+                    solar_kw=sensed_solar_kw,
+                    solar_kw_secure=solar_kw,
+                )
 
-            if blackout:
-                blackout_count += 1
-                if cyber_alert:
-                    cyber_blackout_count += 1
-                if not self._prev_blackout:
+                cyber_alert = evaluate(sensor_data)
+                cyber_anomaly_now = cyber.anomaly_now
+                cyber_reason = cyber.reason
+
+                # Cyber event logging (configurable)
+                if write_cyber_log:
+                    log_this_step = False
+                    if cyber_log_mode == "transition":
+                        log_this_step = cyber_alert and (not self._prev_cyber_alert)
+                    elif cyber_log_mode == "anomaly":
+                        log_this_step = cyber_anomaly_now
+                    elif cyber_log_mode == "active":
+                        log_this_step = cyber_alert
+
+                    if log_this_step:
+                        msg = cyber_reason or "Cyber anomaly detected"
+                        cyber_events.append((t, f"CYBER EVENT: {msg}"))
+
+                # Console note only when entering SAFE_MODE
+                if cyber_alert and (not self._prev_cyber_alert):
                     if not quiet:
-                        print("BLACKOUT DETECTED")
+                        print("SAFE MODE ACTIVE – degraded but stable")
+
+                # --------------------------------------------------
+                # STORE HISTORY FOR AI (PASSIVE ONLY)
+                # --------------------------------------------------
+                slot = self._hist_len % HISTORY_WINDOW
+                self._hist_t[slot] = t
+                self._hist_load[slot] = true_load_kw
+                self._hist_len += 1
+
+                # --------------------------------------------------
+                # AI LOAD FORECAST (ADVISORY)
+                # --------------------------------------------------
+                load_forecast = None
+                if self.forecaster and self._hist_len >= HISTORY_WINDOW:
+                    age = t - last_forecast_t
+                    if (
+                        last_forecast is None
+                        or age >= forecast_stride
+                        or age >= len(last_forecast)
+                    ):
+                        if batch_forecast is not None and t >= FORECAST_HOURS - 1:
+                            load_forecast = batch_forecast[
+                                t - FORECAST_HOURS + 1:t + 1
+                            ]
+                        else:
+                            # Unroll the ring buffer (oldest sample first) into
+                            # the window arrays (also behind self._history_df)
+                            oldest = self._hist_len % HISTORY_WINDOW
+                            newest = HISTORY_WINDOW - oldest
+                            self._win_t[:newest] = self._hist_t[oldest:]
+                            self._win_t[newest:] = self._hist_t[:oldest]
+                            self._win_load[:newest] = self._hist_load[oldest:]
+                            self._win_load[newest:] = self._hist_load[:oldest]
+                            if predict_arrays is not None:
+                                load_forecast = predict_arrays(
+                                    self._win_t,
+                                    self._win_load,
+                                    hours_ahead=FORECAST_HOURS,
+                                )
+                            else:
+                                load_forecast = self.forecaster.predict_next(
+                                    self._history_df,
+                                    hours_ahead=FORECAST_HOURS
+                                )
+                        last_forecast = load_forecast
+                        last_forecast_t = t
+                    else:
+                        # Stale step: drop the hours that have already elapsed
+                        load_forecast = last_forecast[age:]
+
+                ai_forecast_available = load_forecast is not None
+
+                if ai_forecast_available and len(load_forecast) > 0:
+                    buf.ai_forecast_t_plus_1_kw[t] = load_forecast[0]
+                    buf.ai_forecast_avg_6h_kw[t] = np.mean(load_forecast)
+
+                # --------------------------------------------------
+                # CONTROLLER DECISION
+                # --------------------------------------------------
+                decision = decide(
+                    solar_kw=sensed_solar_kw,
+                    load_kw=sensed_load_kw,
+                    battery=battery,
+                    load_forecast=load_forecast,
+                    cyber_anomaly=cyber_alert
+                )
 
-            # --------------------------------------------------
-            # UNSAFE ACTION CHECK (WIN CONDITION)
-            # --------------------------------------------------
-            unsafe = self.battery.soc < 0.20
-            if unsafe:
-                unsafe_count += 1
-                if not self._prev_unsafe:
-                    if not quiet:
-                        print("UNSAFE: Battery deep discharge")
+                reason = decision.get("reason", "")
+                ai_triggered = "Predictive generator start" in reason
 
-            # --------------------------------------------------
-            # SAFETY INVARIANTS (ABSOLUTE)
-            # --------------------------------------------------
-            SafetyInvariants.check(
-                soc=self.battery.soc,
-                generator_cmd=decision["generator_cmd"],
-                generator_available=True,
-                load_shed_level=load_shed_level,
-                safe_mode=(decision["state"] == "SAFE_MODE")
-            )
+                # --------------------------------------------------
+                # SAFE MODE OVERRIDE (NON-BYPASSABLE)
+                # --------------------------------------------------
+                if cyber_alert:
+                    safe_actions = enforce_safe_mode(sensor_data)
+                    decision["generator_cmd"] = "START"
+                    decision["state"] = "SAFE_MODE"
+                    decision["load_shed_level"] = safe_actions.get("load_shed_level", 3)
+                    decision["use_battery"] = safe_actions.get("use_battery", True)
+                    decision["use_generator"] = safe_actions.get("use_generator", True)
+                else:
+                    decision.setdefault("use_battery", True)
+                    decision.setdefault("use_generator", True)
+
+                # Every key below is set at this point; read each one once
+                generator_cmd = decision["generator_cmd"]
+                state = decision["state"]
+                use_battery = decision["use_battery"]
+                use_generator = decision["use_generator"]
+                load_shed_level = int(decision.get("load_shed_level", 0))
+
+                # --------------------------------------------------
+                # LOAD SHEDDING (GRACEFUL DEGRADATION)
+                # --------------------------------------------------
+                # NOTE: dispatch is based on true physical demand, not spoofed sensors
+                served_load_kw = served_by_level_list[t][min(max(load_shed_level, 0), 3)]
+
+                # --------------------------------------------------
+                # APPLY GENERATOR COMMAND
+                # --------------------------------------------------
+                if generator_cmd == "START":
+                    generator.start()
+                elif generator_cmd == "STOP":
+                    generator.stop()
+
+                # --------------------------------------------------
+                # POWER BALANCE (HOSPITAL-GRADE)
+                # --------------------------------------------------
+                # Dispatch generator up to the remaining served load, gated by
+                # its on/use flags (0 when either is off). gen_kw never
+                # exceeds remaining_kw, so the subtraction stays >= 0.
+                remaining_kw = max(0.0, served_load_kw - solar_kw)
+                gen_kw = min(gen_max_kw, remaining_kw) * (generator.is_on and use_generator)
+                remaining_kw -= gen_kw
+
+                # Dispatch battery for any remaining deficit, but never violate safety.
+                discharged_kw = 0.0
+                if remaining_kw > 0 and use_battery:
+                    discharged_kw = discharge(remaining_kw, min_soc=0.30)
+
+                supply_kw = solar_kw + gen_kw + discharged_kw
+                blackout = (supply_kw + POWER_EPS_KW) < served_load_kw
+
+                # --------------------------------------------------
+                # CHARGE BATTERY FROM SURPLUS (REALISTIC OPERATION)
+                # --------------------------------------------------
+                # If solar exceeds served load, store the excess (up to charge limit).
+                battery_charge_kw = 0.0
+                excess_kw = max(0.0, solar_kw - served_load_kw)
+                if excess_kw > 0 and use_battery:
+                    # Battery.charge returns energy (kWh); with dt=1 this matches kW numerically.
+                    battery_charge_kw = float(charge(excess_kw))
+
+                # --------------------------------------------------
+                # CRITICAL LOAD GUARANTEE
+                # --------------------------------------------------
+                critical_served = supply_kw >= CRITICAL_LOAD_KW
+
+                if not critical_served:
+                    if not self._prev_critical_lost:
+                        if not quiet:
+                            print("CRITICAL LOAD LOST")
+
+                if blackout:
+                    if not self._prev_blackout:
+                        if not quiet:
+                            print("BLACKOUT DETECTED")
+
+                # --------------------------------------------------
+                # UNSAFE ACTION CHECK (WIN CONDITION)
+                # --------------------------------------------------
+                soc = battery.soc  # final SOC for this step
+                unsafe = soc < 0.20
+                if unsafe:
+                    if not self._prev_unsafe:
+                        if not quiet:
+                            print("UNSAFE: Battery deep discharge")
+
+                # --------------------------------------------------
+                # SAFETY INVARIANTS (ABSOLUTE)
+                # --------------------------------------------------
+                check(
+                    soc=soc,
+                    generator_cmd=generator_cmd,
+                    generator_available=True,
+                    load_shed_level=load_shed_level,
+                    safe_mode=(state == "SAFE_MODE")
+                )
 
+                # --------------------------------------------------
+                # STORE RESULTS
+                # --------------------------------------------------
+                buf.generator_kw[t] = gen_kw
+                buf.battery_kw[t] = discharged_kw
+                buf.battery_charge_kw[t] = battery_charge_kw
+                buf.battery_soc[t] = soc
+                code = cmd_codes.get(generator_cmd)
+                if code is None:
+                    code = buf.add_category("generator_cmd", generator_cmd)
+                buf.generator_cmd[t] = code
+                buf.generator_on[t] = generator.is_on
+                code = state_codes.get(state)
+                if code is None:
+                    code = buf.add_category("state", state)
+                buf.state[t] = code
+                buf.cyber_alert[t] = cyber_alert
+                buf.cyber_anomaly_now[t] = cyber_anomaly_now
+                buf.cyber_reason[t] = cyber_reason or ""
+                buf.ai_forecast[t] = ai_forecast_available
+                buf.ai_triggered[t] = ai_triggered
+                buf.load_shed_level[t] = load_shed_level
+                buf.served_load_kw[t] = served_load_kw
+                buf.blackout[t] = blackout
+                buf.critical_served[t] = critical_served
+                buf.unsafe[t] = unsafe
+                buf.reason[t] = reason
+
+                self._prev_cyber_alert = cyber_alert
+                self._prev_blackout = blackout
+                self._prev_critical_lost = (not critical_served)
+                self._prev_unsafe = unsafe
+                steps_done = t + 1
+        finally:
             # --------------------------------------------------
-            # PHASE 5 VALIDATION (TRACKED, NOT CRASHING)
+            # PHASE 5 VALIDATION (TRACKED, NOT CRASHING) + LOGS
             # --------------------------------------------------
-            validator_ok = validate_phase5(
-                blackout=blackout,
-                critical_served=critical_served,
-                soc=self.battery.soc
+            buf.validator_ok[:] = validate_phase5_vec(
+                buf.blackout, buf.critical_served, buf.battery_soc
             )
-            if not validator_ok:
-                validator_fail_count += 1
-
-            # --------------------------------------------------
-            # LOG EVERYTHING (JUDGE GOLD)
-            # --------------------------------------------------
-            if write_system_log and (log_every_n and (t % int(log_every_n) == 0)):
-                log_system(
-                    t=t,
-                    state=decision["state"],
-                    soc=self.battery.soc,
-                    supply=supply_kw,
-                    load=true_load_kw,
-                    served_load=served_load_kw,
-                    blackout=blackout,
-                    critical_served=critical_served,
-                    cyber_alert=cyber_alert,
-                    unsafe=unsafe,
-                    validator_ok=validator_ok,
-                    ai_forecast=ai_forecast_available,
-                    ai_triggered=ai_triggered,
-                    reason=decision.get("reason", "")
+            if write_system_log:
+                write_system_lines(
+                    buf.system_log_lines(steps_done, log_every_n, load_arr, solar_arr),
+                    log_dir=self.log_dir,
                 )
+            for t, message in cyber_events:
+                self.cyber.log_event(t, message)
+            # Make this run's cyber events visible to readers of the log
+            # file, also when a safety violation is propagating
+            self.cyber.close()
+
+        df = buf.to_frame(
+            time=np.arange(horizon, dtype=np.int32),
+            load_kw=load_arr,
+            sensed_load_kw=sensed_load_arr,
+            solar_kw=solar_arr,
+            sensed_solar_kw=sensed_solar_arr,
+            battery_soc_pct=buf.battery_soc * 100.0,
+            attack_active=attack_active_arr,
+            attack_types=pd.Categorical(attack_types_arr),
+        )
+
+        # --------------------------------------------------
+        # SUMMARY (ONE VECTORIZED PASS OVER THE RESULT COLUMNS)
+        # --------------------------------------------------
+        cyber_alert_arr = buf.cyber_alert
+        # cyber_alert is latched once detected; count both triggers (rising
+        # edges) and active steps
+        alert_rises = np.flatnonzero(
+            cyber_alert_arr
+            & ~np.concatenate(([prev_cyber_alert], cyber_alert_arr[:-1]))
+        )
+        cyber_alert_count = len(alert_rises)
+        cyber_first_timestep = int(alert_rises[0]) if cyber_alert_count else None
 
-            # --------------------------------------------------
-            # STORE RESULTS
-            # --------------------------------------------------
-            results.append({
-                "time": t,
-                "load_kw": true_load_kw,
-                "sensed_load_kw": sensed_load_kw,
-                "solar_kw": solar_kw,
-                "sensed_solar_kw": sensed_solar_kw,
-                "generator_kw": gen_kw,
-                "battery_kw": discharged_kw,
-                "battery_charge_kw": battery_charge_kw,
-                "battery_soc": self.battery.soc,
-                "battery_soc_pct": self.battery.soc * 100.0,
-                "generator_cmd": decision["generator_cmd"],
-                "generator_on": bool(self.generator.is_on),
-                "state": decision["state"],
-                "cyber_alert": cyber_alert,
-                "cyber_anomaly_now": cyber_anomaly_now,
-                "cyber_reason": cyber_reason or "",
-                "attack_active": attack_active,
-                "attack_types": ",".join(sorted(set(active_attack_types))) if active_attack_types else "",
-                "ai_forecast": ai_forecast_available,
-                "ai_triggered": ai_triggered,
-                "ai_forecast_t_plus_1_kw": forecast_t_plus_1_kw,
-                "ai_forecast_avg_6h_kw": forecast_avg_6h_kw,
-                "load_shed_level": load_shed_level,
-                "served_load_kw": served_load_kw,
-                "blackout": blackout,
-                "critical_served": critical_served,
-                "unsafe": unsafe,
-                "validator_ok": validator_ok,
-                "reason": decision.get("reason", "")
-            })
-
-            self._prev_cyber_alert = cyber_alert
-            self._prev_blackout = blackout
-            self._prev_critical_lost = (not critical_served)
-            self._prev_unsafe = unsafe
-
-        df = pd.DataFrame(results)
         df.attrs["summary"] = {
             "timesteps": horizon,
-            "blackout_count": blackout_count,
-            "cyber_blackout_count": cyber_blackout_count,
+            "blackout_count": int(np.count_nonzero(buf.blackout)),
+            "cyber_blackout_count": int(
+                np.count_nonzero(buf.blackout & cyber_alert_arr)
+            ),
             # Back-compat note: cyber_alert_count now means trigger events (not active steps)
             "cyber_alert_count": cyber_alert_count,
-            "cyber_alert_active_steps": cyber_alert_active_steps,
-            "cyber_anomaly_steps": cyber_anomaly_steps,
-            "attack_active_steps": attack_active_steps,
+            "cyber_alert_active_steps": int(np.count_nonzero(cyber_alert_arr)),
+            "cyber_anomaly_steps": int(np.count_nonzero(buf.cyber_anomaly_now)),
+            "attack_active_steps": int(np.count_nonzero(attack_active_arr)),
             "cyber_first_timestep": cyber_first_timestep,
-            "critical_lost_count": critical_lost_count,
-            "unsafe_count": unsafe_count,
-            "validator_fail_count": validator_fail_count,
-            "ai_forecast_count": ai_forecast_count,
-            "ai_trigger_count": ai_trigger_count,
+            "critical_lost_count": int(np.count_nonzero(~buf.critical_served)),
+            "unsafe_count": int(np.count_nonzero(buf.unsafe)),
+            "validator_fail_count": int(np.count_nonzero(~buf.validator_ok)),
+            "ai_forecast_count": int(np.count_nonzero(buf.ai_forecast)),
+            "ai_trigger_count": int(np.count_nonzero(buf.ai_triggered)),
         }
         return df
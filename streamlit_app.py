@@ -1,5 +1,7 @@
+import hashlib
 import json
 import os
+import pickle
 from dataclasses import dataclass
 
 import numpy as np
@@ -14,7 +16,7 @@ from components.generator import DieselGenerator
 from components.solar import SolarPV
 from controller.microgrid_controller import MicrogridController
 from scenarios.normal_day import load_profiles
-from simulation.simulator import CRITICAL_LOAD_KW, MicrogridSimulator
+from simulation.simulator import CRITICAL_LOAD_KW, STATES, MicrogridSimulator
 
 
 st.set_page_config(
@@ -33,12 +35,20 @@ class AssetSizing:
     battery_max_charge_kw: float = 800.0
 
 
-@st.cache_data(show_spinner=False)
+@st.cache_resource(show_spinner=False)
 def load_dataset() -> tuple[np.ndarray, np.ndarray]:
+    # load_profiles() memory-maps its on-disk .npy cache (read-only), so the
+    # arrays are shared as-is instead of cache_data pickling a copy per call
     load, solar_profile = load_profiles()
     return np.asarray(load, dtype=float), np.asarray(solar_profile, dtype=float)
 
 
+@st.cache_resource(show_spinner=False)
+def load_forecaster() -> LoadForecaster:
+    # Unpickled once per server process and shared by every run and session
+    return LoadForecaster("ai/models/load_forecaster.pkl")
+
+
 @st.cache_data(show_spinner=True)
 def run_simulation(
     sizing: AssetSizing,
@@ -51,7 +61,7 @@ def run_simulation(
     # Full dataset by default
     solar_profile = solar_profile * float(sizing.solar_profile_scale)
 
-    forecaster = LoadForecaster("ai/models/load_forecaster.pkl")
+    forecaster = load_forecaster()
 
     solar = SolarPV(max_power_kw=float(sizing.solar_max_power_kw))
     battery = Battery(
@@ -115,9 +125,42 @@ def _inference(ok: bool, good_text: str, bad_text: str):
         st.error(bad_text)
 
 
+def _rolling_z(values, window: int = 24, min_periods: int = 12) -> np.ndarray:
+    """
+    Trailing rolling z-score, as Series.rolling(window, min_periods) mean/std
+    (ddof=1, zero std -> NaN), from cumulative sums in O(n).
+    """
+    x = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(x)
+    # Centred so the running sums stay small relative to each window
+    centred = np.where(valid, x - (np.nanmean(x) if valid.any() else 0.0), 0.0)
+
+    count = np.concatenate(([0], np.cumsum(valid)))
+    s1 = np.concatenate(([0.0], np.cumsum(centred)))
+    s2 = np.concatenate(([0.0], np.cumsum(centred * centred)))
+    hi = np.arange(1, len(x) + 1)
+    lo = np.maximum(hi - window, 0)
+    n = count[hi] - count[lo]
+    w1 = s1[hi] - s1[lo]
+    w2 = s2[hi] - s2[lo]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu = w1 / n
+        sq_dev = w2 - w1 * mu
+        # Constant windows: what is left is rounding error of the running sums
+        sq_dev[sq_dev <= 16 * np.finfo(np.float64).eps * s2[hi]] = 0.0
+        sigma = np.sqrt(sq_dev / (n - 1))
+        sigma[(n < max(min_periods, 2)) | (sigma == 0)] = np.nan
+        return (np.where(valid, centred, np.nan) - mu) / sigma
+
+
+_STATE_INDEX = pd.Index(STATES)
+
+
 def _state_to_code(state: pd.Series) -> pd.Series:
-    mapping = {"NORMAL": 0, "STRESSED": 1, "EMERGENCY": 2, "SAFE_MODE": 3}
-    return state.map(mapping).fillna(-1)
+    # NORMAL=0, STRESSED=1, EMERGENCY=2, SAFE_MODE=3; anything else -1
+    # via one vectorized hash lookup instead of a per-row dict map
+    return pd.Series(_STATE_INDEX.get_indexer(state), index=state.index)
 
 
 def main():
@@ -130,8 +173,8 @@ def main():
         st.session_state["df"] = None
     if "summary" not in st.session_state:
         st.session_state["summary"] = None
-    if "last_run_params" not in st.session_state:
-        st.session_state["last_run_params"] = None
+    if "last_run_key" not in st.session_state:
+        st.session_state["last_run_key"] = None
     if "attack_table" not in st.session_state:
         st.session_state["attack_table"] = pd.DataFrame(
             [
@@ -248,9 +291,14 @@ def main():
             attacks.append(a)
 
     run_params["attacks_json"] = json.dumps(attacks, sort_keys=True)
-
-    if run_clicked:
-        st.session_state["last_run_params"] = run_params
+    run_key = hashlib.blake2b(pickle.dumps(run_params)).hexdigest()
+
+    # Re-clicking with unchanged settings keeps the results already shown
+    if run_clicked and not (
+        st.session_state["last_run_key"] == run_key
+        and st.session_state.get("df") is not None
+    ):
+        st.session_state["last_run_key"] = run_key
         with st.spinner("Running simulation..."):
             df, summary = run_simulation(**run_params)
         st.session_state["df"] = df
@@ -265,29 +313,44 @@ def main():
     df = st.session_state["df"]
     summary = st.session_state["summary"]
 
-    last_params = st.session_state.get("last_run_params")
-    if last_params is not None and last_params != run_params:
+    last_key = st.session_state.get("last_run_key")
+    if last_key is not None and last_key != run_key:
         st.warning("Sidebar settings changed — click ‘Run Simulation’ to apply.")
 
+    # Row masks shared by the tables below, built once per rerun
+    cyber_col = "cyber_anomaly_now" if "cyber_anomaly_now" in df.columns else "cyber_alert"
+    cyber_mask = df[cyber_col].to_numpy(dtype=bool)
+    ai_mask = df["ai_triggered"].to_numpy(dtype=bool)
+    ai_during_cyber_mask = df["cyber_alert"].to_numpy(dtype=bool) & df["ai_forecast"].to_numpy(dtype=bool)
+    event_cols = [
+        c
+        for c in ["time", "cyber_alert", "cyber_anomaly_now", "cyber_reason", "attack_active", "attack_types", "state"]
+        if c in df.columns
+    ]
+
     # Executive snapshot
     _kpi_row(summary)
 
     st.divider()
 
-    # Optional downsample for faster plots
-    df_plot = df if log_every_n <= 1 else df.iloc[:: int(log_every_n)].copy()
+    # Optional downsample for faster plots: a strided slice that is never
+    # mutated below, so no copy. Traces get NumPy arrays and draw with WebGL.
+    df_plot = df if log_every_n <= 1 else df.iloc[:: int(log_every_n)]
+    t_plot = df_plot["time"].to_numpy()
+    state_code_plot = _state_to_code(df_plot["state"]).to_numpy()
 
     # ------------------------------------------------------------------
     # SYSTEM BEHAVIOR
     # ------------------------------------------------------------------
     with st.expander("⚡ Power Flow & System Behavior", expanded=True):
         st.subheader("1) Load vs Total Supply")
-        df_plot = df_plot.copy()
-        df_plot["total_supply_kw"] = df_plot["solar_kw"] + df_plot["generator_kw"] + df_plot["battery_kw"]
+        total_supply_kw = (
+            df_plot["solar_kw"].to_numpy() + df_plot["generator_kw"].to_numpy() + df_plot["battery_kw"].to_numpy()
+        )
 
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["served_load_kw"], name="Served Load (kW)"))
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["total_supply_kw"], name="Total Supply (kW)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["served_load_kw"].to_numpy(), name="Served Load (kW)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=total_supply_kw, name="Total Supply (kW)"))
         fig.update_layout(height=320, margin=dict(l=10, r=10, t=30, b=10), legend=dict(orientation="h"))
         st.plotly_chart(fig, use_container_width=True)
 
@@ -299,7 +362,7 @@ def main():
 
         st.subheader("2) Battery SOC Timeline")
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["battery_soc_pct"], name="SOC (%)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["battery_soc_pct"].to_numpy(), name="SOC (%)"))
         fig.add_hline(y=30, line_dash="dash", line_color="orange")
         fig.add_hline(y=20, line_dash="dash", line_color="red")
         fig.update_layout(height=320, margin=dict(l=10, r=10, t=30, b=10))
@@ -313,7 +376,7 @@ def main():
 
         st.subheader("3) Generator Operation")
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["generator_kw"], name="Generator Power (kW)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["generator_kw"].to_numpy(), name="Generator Power (kW)"))
         fig.update_layout(height=280, margin=dict(l=10, r=10, t=30, b=10))
         st.plotly_chart(fig, use_container_width=True)
 
@@ -324,9 +387,13 @@ def main():
     # ------------------------------------------------------------------
     with st.expander("🧠 Autonomous Controller Decisions"):
         st.subheader("4) Controller State Timeline")
-        df_state = df_plot[["time", "state"]].copy()
-        df_state["state_code"] = _state_to_code(df_state["state"])
-        fig = px.line(df_state, x="time", y="state_code", title=None)
+        fig = px.line(
+            x=t_plot,
+            y=state_code_plot,
+            labels={"x": "time", "y": "state_code"},
+            title=None,
+            render_mode="webgl",
+        )
         fig.update_layout(height=260, margin=dict(l=10, r=10, t=30, b=10))
         fig.update_yaxes(
             tickmode="array",
@@ -342,16 +409,18 @@ def main():
         show_ai_only = c2.checkbox("Show only AI-influenced", value=False)
         show_cyber_only = c3.checkbox("Show only cyber-related timesteps", value=False)
 
-        cyber_col = "cyber_anomaly_now" if "cyber_anomaly_now" in df.columns else "cyber_alert"
-        table = df[["time", "state", "generator_cmd", "ai_triggered", "cyber_alert", "reason"]].copy()
-        if cyber_col not in table.columns:
-            table[cyber_col] = df[cyber_col]
+        table_cols = ["time", "state", "generator_cmd", "ai_triggered", "cyber_alert", "reason"]
+        if cyber_col not in table_cols:
+            table_cols.append(cyber_col)
+        keep = np.ones(len(df), dtype=bool)
         if show_safe_mode_only:
-            table = table[table["state"] == "SAFE_MODE"]
+            keep &= (df["state"] == "SAFE_MODE").to_numpy()
         if show_ai_only:
-            table = table[table["ai_triggered"]]
+            keep &= ai_mask
         if show_cyber_only:
-            table = table[df[cyber_col]]
+            keep &= cyber_mask
+        # Narrow to the shown columns, then gather the kept rows in one pass
+        table = df[table_cols].take(np.flatnonzero(keep))
 
         st.dataframe(table, use_container_width=True, height=320)
         st.write("Inference: All actions are explainable and logged with human-readable reasons.")
@@ -361,17 +430,16 @@ def main():
     # ------------------------------------------------------------------
     with st.expander("🤖 AI Forecasting & Predictive Control"):
         st.subheader("6) Load Forecast vs Actual")
-        df_ai = df_plot[["time", "load_kw", "ai_forecast_t_plus_1_kw", "ai_forecast_avg_6h_kw"]].copy()
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_ai["time"], y=df_ai["load_kw"], name="Actual Load (kW)"))
-        fig.add_trace(go.Scatter(x=df_ai["time"], y=df_ai["ai_forecast_avg_6h_kw"], name="AI Forecast (avg next 6h)", opacity=0.8))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["load_kw"].to_numpy(), name="Actual Load (kW)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["ai_forecast_avg_6h_kw"].to_numpy(), name="AI Forecast (avg next 6h)", opacity=0.8))
         fig.update_layout(height=320, margin=dict(l=10, r=10, t=30, b=10), legend=dict(orientation="h"))
         st.plotly_chart(fig, use_container_width=True)
 
         st.write("Inference: AI forecasts are generated after sufficient history and can trigger preventive generator starts in normal operation.")
 
         st.subheader("7) AI Trigger Events")
-        triggers = df[df["ai_triggered"]][["time", "state", "generator_cmd", "reason"]]
+        triggers = df[["time", "state", "generator_cmd", "reason"]].take(np.flatnonzero(ai_mask))
         st.dataframe(triggers, use_container_width=True, height=240)
         st.write("Inference: AI influences decisions without overriding safety rules.")
 
@@ -380,7 +448,9 @@ def main():
             "During cyber alert, SAFE_MODE is enforced and the controller is driven by deterministic safety logic. "
             "AI forecasting can remain active (forecasts generated) but decisions are safety-gated."
         )
-        ai_during_cyber = df[(df["cyber_alert"]) & (df["ai_forecast"])][["time", "state", "ai_forecast", "ai_triggered", "reason"]]
+        ai_during_cyber = df[["time", "state", "ai_forecast", "ai_triggered", "reason"]].take(
+            np.flatnonzero(ai_during_cyber_mask)
+        )
         st.dataframe(ai_during_cyber, use_container_width=True, height=220)
 
     # ------------------------------------------------------------------
@@ -389,12 +459,12 @@ def main():
     with st.expander("🔒 Cyber Security & Safe-Mode Operation"):
         st.subheader("9) Cyber Attack Timeline")
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["cyber_alert"].astype(int), name="Cyber Alert (latched)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["cyber_alert"].to_numpy(dtype=int), name="Cyber Alert (latched)"))
         if "cyber_anomaly_now" in df_plot.columns:
-            fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["cyber_anomaly_now"].astype(int), name="Anomaly this step"))
+            fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["cyber_anomaly_now"].to_numpy(dtype=int), name="Anomaly this step"))
         if "attack_active" in df_plot.columns:
-            fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["attack_active"].astype(int), name="Attack window (simulated)", opacity=0.6))
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=_state_to_code(df_plot["state"]), name="State (coded)", opacity=0.7))
+            fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["attack_active"].to_numpy(dtype=int), name="Attack window (simulated)", opacity=0.6))
+        fig.add_trace(go.Scattergl(x=t_plot, y=state_code_plot, name="State (coded)", opacity=0.7))
         fig.update_layout(height=280, margin=dict(l=10, r=10, t=30, b=10), legend=dict(orientation="h"))
         st.plotly_chart(fig, use_container_width=True)
         st.caption(
@@ -405,9 +475,9 @@ def main():
 
         st.subheader("10) SAFE_MODE Behavior")
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["served_load_kw"], name="Served Load (kW)"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["served_load_kw"].to_numpy(), name="Served Load (kW)"))
         fig.add_hline(y=CRITICAL_LOAD_KW, line_dash="dash", line_color="green")
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["generator_kw"], name="Generator Power (kW)", opacity=0.7))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["generator_kw"].to_numpy(), name="Generator Power (kW)", opacity=0.7))
         fig.update_layout(height=320, margin=dict(l=10, r=10, t=30, b=10), legend=dict(orientation="h"))
         st.plotly_chart(fig, use_container_width=True)
         st.write("Inference: Under attack, non-critical demand is shed, generator is forced ON, and battery deep discharge is prevented.")
@@ -422,18 +492,7 @@ def main():
             st.info("No cyber log file found yet.")
 
         st.subheader("12) Cyber Events (from this run)")
-        event_mask = None
-        if "cyber_anomaly_now" in df.columns:
-            event_mask = df["cyber_anomaly_now"]
-        else:
-            event_mask = df["cyber_alert"]
-
-        cols = ["time", "cyber_alert"]
-        for c in ["cyber_anomaly_now", "cyber_reason", "attack_active", "attack_types", "state"]:
-            if c in df.columns:
-                cols.append(c)
-
-        events = df.loc[event_mask, cols].copy()
+        events = df[event_cols].take(np.flatnonzero(cyber_mask))
         st.dataframe(events, use_container_width=True, height=240)
 
         st.write("Inference: Full forensic trace is available via cyber event logs.")
@@ -444,7 +503,7 @@ def main():
     with st.expander("✅ Validation, Outliers & Stress Points"):
         st.subheader("12) Validator Timeline")
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_plot["time"], y=df_plot["validator_ok"].astype(int), name="validator_ok"))
+        fig.add_trace(go.Scattergl(x=t_plot, y=df_plot["validator_ok"].to_numpy(dtype=int), name="validator_ok"))
         fig.update_layout(height=240, margin=dict(l=10, r=10, t=30, b=10))
         st.plotly_chart(fig, use_container_width=True)
 
@@ -457,10 +516,7 @@ def main():
         st.subheader("13) Outlier Detection")
         df_out = df_plot[["time", "load_kw", "solar_kw", "battery_soc_pct"]].copy()
         for col in ["load_kw", "solar_kw"]:
-            rolling = df_out[col].rolling(window=24, min_periods=12)
-            mu = rolling.mean()
-            sigma = rolling.std().replace(0, np.nan)
-            df_out[f"{col}_z"] = (df_out[col] - mu) / sigma
+            df_out[f"{col}_z"] = _rolling_z(df_out[col].to_numpy(), window=24, min_periods=12)
 
         spikes = df_out[df_out["load_kw_z"].abs() > 3][["time", "load_kw", "load_kw_z"]]
         solar_drops = df_out[df_out["solar_kw_z"].abs() > 3][["time", "solar_kw", "solar_kw_z"]]
@@ -1,6 +1,87 @@
 import os
 
 
+SYSTEM_LOG_FILE = "system_log.txt"
+
+# Every field present (what the simulator writes): one %-format, no list
+_FULL_LINE = (
+    "time=%s, state=%s, soc=%.3f, supply=%.3f, load=%.3f, served_load=%.3f, "
+    "blackout=%s, critical_served=%s, cyber_alert=%s, unsafe=%s, "
+    "validator_ok=%s, ai_forecast=%s, ai_triggered=%s"
+)
+
+
+def format_system_line(
+    t,
+    state,
+    soc,
+    supply,
+    load,
+    served_load=None,
+    blackout=False,
+    critical_served=None,
+    cyber_alert=None,
+    unsafe=None,
+    validator_ok=None,
+    ai_forecast=None,
+    ai_triggered=None,
+    reason="",
+):
+    """
+    One system-log line (newline included), without touching the file.
+    """
+    if None not in (served_load, critical_served, cyber_alert, unsafe,
+                    validator_ok, ai_forecast, ai_triggered):
+        line = _FULL_LINE % (
+            t, state, soc, supply, load, served_load, bool(blackout),
+            bool(critical_served), bool(cyber_alert), bool(unsafe),
+            bool(validator_ok), bool(ai_forecast), bool(ai_triggered),
+        )
+        return f"{line}, reason={reason}\n" if reason else line + "\n"
+
+    parts = [
+        f"time={t}",
+        f"state={state}",
+        f"soc={soc:.3f}",
+        f"supply={supply:.3f}",
+        f"load={load:.3f}",
+    ]
+
+    if served_load is not None:
+        parts.append(f"served_load={served_load:.3f}")
+
+    parts.append(f"blackout={bool(blackout)}")
+
+    if critical_served is not None:
+        parts.append(f"critical_served={bool(critical_served)}")
+    if cyber_alert is not None:
+        parts.append(f"cyber_alert={bool(cyber_alert)}")
+    if unsafe is not None:
+        parts.append(f"unsafe={bool(unsafe)}")
+    if validator_ok is not None:
+        parts.append(f"validator_ok={bool(validator_ok)}")
+    if ai_forecast is not None:
+        parts.append(f"ai_forecast={bool(ai_forecast)}")
+    if ai_triggered is not None:
+        parts.append(f"ai_triggered={bool(ai_triggered)}")
+
+    if reason:
+        parts.append(f"reason={reason}")
+
+    return ", ".join(parts) + "\n"
+
+
+def write_system_lines(lines, log_dir="logs"):
+    """
+    Append preformatted lines to the system log with a single open/write.
+    """
+    if not lines:
+        return
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, SYSTEM_LOG_FILE), "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
 def log_system(
     t,
     state,
@@ -17,35 +98,25 @@ def log_system(
     ai_triggered=None,
     reason="",
 ):
-    os.makedirs("logs", exist_ok=True)
-    with open("logs/system_log.txt", "a", encoding="utf-8") as f:
-        parts = [
-            f"time={t}",
-            f"state={state}",
-            f"soc={soc:.3f}",
-            f"supply={supply:.3f}",
-            f"load={load:.3f}",
-        ]
-
-        if served_load is not None:
-            parts.append(f"served_load={served_load:.3f}")
-
-        parts.append(f"blackout={bool(blackout)}")
-
-        if critical_served is not None:
-            parts.append(f"critical_served={bool(critical_served)}")
-        if cyber_alert is not None:
-            parts.append(f"cyber_alert={bool(cyber_alert)}")
-        if unsafe is not None:
-            parts.append(f"unsafe={bool(unsafe)}")
-        if validator_ok is not None:
-            parts.append(f"validator_ok={bool(validator_ok)}")
-        if ai_forecast is not None:
-            parts.append(f"ai_forecast={bool(ai_forecast)}")
-        if ai_triggered is not None:
-            parts.append(f"ai_triggered={bool(ai_triggered)}")
-
-        if reason:
-            parts.append(f"reason={reason}")
-
-        f.write(", ".join(parts) + "\n")
+    """
+    Format and append a single line (for a whole run of lines,
+    write_system_lines opens the file once).
+    """
+    write_system_lines([
+        format_system_line(
+            t,
+            state,
+            soc,
+            supply,
+            load,
+            served_load=served_load,
+            blackout=blackout,
+            critical_served=critical_served,
+            cyber_alert=cyber_alert,
+            unsafe=unsafe,
+            validator_ok=validator_ok,
+            ai_forecast=ai_forecast,
+            ai_triggered=ai_triggered,
+            reason=reason,
+        )
+    ])
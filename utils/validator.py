@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def validate_phase5(blackout, critical_served, soc):
     if blackout:
         return False
@@ -8,6 +11,17 @@ def validate_phase5(blackout, critical_served, soc):
     return True
 
 
+def validate_phase5_vec(blackout, critical_served, soc):
+    """
+    validate_phase5 for every step of a run at once (per-step bool array).
+    """
+    return (
+        ~np.asarray(blackout, dtype=bool)
+        & np.asarray(critical_served, dtype=bool)
+        & ~(np.asarray(soc, dtype=np.float64) < 0.20)
+    )
+
+
 # Backwards compatibility
 def validator(blackout, critical_served, soc):
     return validate_phase5(